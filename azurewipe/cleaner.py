@@ -1,81 +1,365 @@
 """Main orchestration for Azure resource cleanup."""
 import logging
-from typing import Dict, List, Any
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from typing import Any, Callable, Dict, List, Optional
 from azure.core.credentials import TokenCredential
 from azurewipe.core.config import Config
 from azurewipe.core.auth import get_credential
+from azurewipe.core.logging import get_run_id
 from azurewipe.core.graph import ResourceGraphQuery
-from azurewipe.resources import CLEANERS
+from azurewipe.core.inventory import Inventory, Snapshot
+from azurewipe.core.profiling import phase, start_profiling, stop_profiling
+from azurewipe.core.progress import ProgressTracker
+from azurewipe.core.retry import add_throttle_listener, remove_throttle_listener
+from azurewipe.core.state import RunState, resume
+from azurewipe.executors import make_executor
+from azurewipe.resources import CLEANERS, ResourceCleaner, SpecCleaner
+from azurewipe.scheduler import RunBudget, dependency_waves, prioritise
 
 
 class AzureResourceCleaner:
     """Orchestrates Azure resource cleanup."""
 
     # Deletion order (dependencies first)
-    CLEANUP_ORDER = ["vm", "disk", "nic", "publicip", "nsg", "resource_group"]
+    CLEANUP_ORDER = [
+        "vm", "snapshot", "image", "disk", "nic", "lb", "publicip", "nsg", "vnet",
+        "storage", "appserviceplan", "resource_group",
+    ]
 
-    def __init__(self, config: Config, credential: TokenCredential = None):
+    def __init__(self, config: Config, credential: TokenCredential = None,
+                 progress: ProgressTracker = None, budget: Optional[RunBudget] = None,
+                 resume_state: Optional[RunState] = None):
         self.config = config
-        self.credential = credential or get_credential()
-        self.graph = ResourceGraphQuery(self.credential)
-        self.report: Dict[str, Dict[str, List]] = {}
+        self.budget = budget  # Shared when several tenants run under one budget
+        self.resume_state = resume_state  # Interrupted run whose leftovers are the work list
+        self.credential = credential or get_credential(persist=config.token_cache)
+        if hasattr(self.credential, "warm"):
+            self.credential.warm()
+        self.tenant_id = getattr(self.credential, "tenant_id", None) or ""
+        self.graph = ResourceGraphQuery(self.credential, config.management_groups)
+        self.policies = config.resolve_policies()
+        self.report: Dict[str, Dict[str, Dict[str, Any]]] = {}  # policy -> type -> report
+        self.inventory: Optional[Inventory] = None
+        self.snapshot: Optional[Snapshot] = None
+        self.cleaners: Dict[str, Dict[str, ResourceCleaner]] = {}  # type -> policy -> cleaner
+        self.progress = progress or ProgressTracker()
 
-    def _get_subscriptions(self) -> List[str]:
-        """Get list of subscriptions to clean."""
-        if "all" in self.config.subscriptions:
+    def _get_subscriptions(self) -> Optional[List[str]]:
+        """Get list of subscriptions to clean (the union over all policies).
+
+        None when management groups bound the run, so queries are scoped
+        to them instead.
+        """
+        if "all" not in self.config.subscriptions:
+            # Policies can narrow the top-level list but never reach outside it
+            subs = [s for s in self.config.subscriptions
+                    if any(p.should_include_subscription(s) for p in self.policies)]
+            if self.config.management_groups:
+                in_groups = {s.lower() for s in self.graph.list_subscriptions()}
+                dropped = [s for s in subs if s.lower() not in in_groups]
+                if dropped:
+                    logging.warning(f"Skipping {len(dropped)} subscription(s) outside management groups "
+                                    f"{', '.join(self.config.management_groups)}: {', '.join(dropped)}")
+                subs = [s for s in subs if s.lower() in in_groups]
+            return subs
+        if any("all" in p.subscriptions for p in self.policies):
+            if self.config.management_groups:
+                return None
             return self.graph.list_subscriptions()
-        return self.config.subscriptions
+        return list(dict.fromkeys(s for p in self.policies for s in p.subscriptions))
+
+    def _types_for(self, policy: Config) -> List[str]:
+        """Types a policy cleans; a top-level resource_types list also bounds every policy."""
+        if "all" in policy.resource_types:
+            types = [t for t in self.CLEANUP_ORDER if not CLEANERS[t].opt_in]
+        else:
+            for res_type in policy.resource_types:
+                if res_type not in CLEANERS:
+                    logging.warning(f"Unknown resource type: {res_type}")
+            types = [t for t in self.CLEANUP_ORDER if t in policy.resource_types]
+        if policy is not self.config and "all" not in self.config.resource_types:
+            types = [t for t in types if t in self.config.resource_types]
+        return types
 
-    def purge(self):
+    def purge(self, show_report: bool = True):
         """Run the cleanup process."""
-        subscriptions = self._get_subscriptions()
-        logging.info(f"Cleaning {len(subscriptions)} subscription(s)")
+        # The deadline covers the whole run, subscription listing included
+        budget = self.budget or RunBudget(self.config.time_budget, self.config.max_deletes,
+                                          self.config.operation_timeout, self.config.drain_grace)
+        if self.config.profile:
+            start_profiling(get_run_id())
+        add_throttle_listener(self.credential, self.progress.record_throttle)
+        try:
+            self._purge(budget)
+            if show_report:
+                with phase("report"):
+                    self.print_report()
+        finally:
+            remove_throttle_listener(self.credential, self.progress.record_throttle)
+            self.progress.finish()
+            if self.config.profile:
+                stop_profiling()
+
+    def _assign(self, res_type: str, resources: List[Dict[str, Any]]) -> List[tuple]:
+        """Give each resource to the first policy whose filters accept it.
+
+        Leftovers are reported as skipped by the last policy that covers
+        the type, which for a single config is the config itself.
+        """
+        queue = []
+        remaining = resources
+        for name, cleaner in self.cleaners[res_type].items():
+            matched, remaining = cleaner.select(remaining)
+            queue.extend((cleaner, res) for res in cleaner.admit(matched))
+            self.report.setdefault(name, {})[res_type] = cleaner.report
+        cleaner.skip(remaining)
+        return queue
+
+    def _pushdown(self, types: List[str]) -> Dict[str, str]:
+        """Lifetime rules to filter in KQL: per type, any covering policy's rules may match.
+
+        A type is only filtered when every policy covering it has rules,
+        so nothing a policy would accept is dropped server-side. On resume,
+        types the interrupted run left resources of are limited to those IDs.
+        """
+        conditions = {}
+        for res_type in types:
+            rules = [c.config.lifetime_kql() for c in self.cleaners.get(res_type, {}).values()]
+            if rules and all(rules):
+                conditions[res_type] = " or ".join(f"({r})" for r in dict.fromkeys(rules))
+            pending = self.resume_state.pending_kql(res_type) if self.resume_state else None
+            if pending and res_type in conditions:
+                conditions[res_type] = f"({conditions[res_type]}) and {pending}"
+            elif pending:
+                conditions[res_type] = pending
+        return conditions
+
+    def _step(self, budget: RunBudget, cleaner: ResourceCleaner, res: Dict[str, Any],
+              delete: Optional[Callable] = None) -> None:
+        """Process one queued resource; called concurrently by the parallel executors.
+
+        A report-only policy inside a live run must not make its resource
+        group look empty to a live one.
+        """
+        if not budget.try_spend():
+            cleaner.defer(res, "budget exhausted")
+            return
+        removed = cleaner.process(res, delete) and (self.config.dry_run or not cleaner.config.dry_run)
+        if removed and self.inventory is not None:
+            self.inventory.remove(res)
+        if removed and self.snapshot is not None:
+            self.snapshot.remove(res)
+
+    def _clean(self, executor, budget: RunBudget, discovered: Dict[str, List[Dict[str, Any]]]) -> None:
+        """Assign discovered resources to policies and work through them, most expensive first."""
+        queue = []
+        with phase("filter"):
+            for res_type, resources in discovered.items():
+                queue.extend(self._assign(res_type, resources))
+        executor.run(lambda cleaner, res, delete: self._step(budget, cleaner, res, delete),
+                     prioritise(queue))
+
+    def _purge(self, budget: RunBudget):
+        executor = make_executor(self.config)
+        try:
+            self._run_waves(executor, budget)
+        finally:
+            executor.close()
+
+    def _run_waves(self, executor, budget: RunBudget):
+        self.progress.set_phase("listing subscriptions")
+        with phase("discovery"):
+            subscriptions = self._get_subscriptions()
+        scope = (f"management group(s) {', '.join(self.config.management_groups)}" if subscriptions is None
+                 else f"{len(subscriptions)} subscription(s)")
+        logging.info(f"Cleaning {scope} with {len(self.policies)} policy(ies)")
 
         if self.config.dry_run:
             logging.info("DRY-RUN MODE - no resources will be deleted")
 
-        # Determine which resource types to clean
-        if "all" in self.config.resource_types:
-            types_to_clean = self.CLEANUP_ORDER
-        else:
-            types_to_clean = [t for t in self.CLEANUP_ORDER if t in self.config.resource_types]
+        # One cleaner per (type, policy); policies keep their declared order
+        self.cleaners = {}
+        for policy in self.policies:
+            for res_type in self._types_for(policy):
+                cleaner = CLEANERS[res_type](self.credential, policy, self.progress, budget)
+                self.cleaners.setdefault(res_type, {})[policy.name] = cleaner
+        types_to_clean = [t for t in self.CLEANUP_ORDER if t in self.cleaners]
+
+        # Empty resource groups are tracked from an inventory loaded up front
+        # and updated as deletes complete, instead of a join re-run at the end.
+        # Reloaded every run: a previous run's counts are stale.
+        self.inventory = None
+        if "resource_group" in self.cleaners:
+            self.progress.set_phase("loading inventory")
+            patterns = self.config.resource_groups
+            if "all" in patterns:
+                patterns = [g for p in self.policies for g in p.resource_groups]
+            with phase("discovery"):
+                self.inventory = Inventory.load(self.graph, subscriptions, patterns)
 
-        # Clean in dependency order
-        for res_type in types_to_clean:
-            if res_type not in CLEANERS:
-                logging.warning(f"Unknown resource type: {res_type}")
-                continue
+        # Every spec type is discovered in one point-in-time snapshot that
+        # also tracks what holds in-use resources, so deletes in one wave
+        # surface newly orphaned resources without another query
+        specs = [CLEANERS[t].spec for t in types_to_clean if issubclass(CLEANERS[t], SpecCleaner)]
+        if specs:
+            self.progress.set_phase("discovering")
+            with phase("discovery"):
+                self.snapshot = Snapshot.load(self.graph, specs, subscriptions, self._pushdown(types_to_clean))
 
-            cleaner_class = CLEANERS[res_type]
-            cleaner = cleaner_class(self.credential, self.config)
-            report = cleaner.clean(subscriptions)
-            self.report[res_type] = report
+        # Each wave only depends on earlier ones; within a wave the most
+        # expensive resources go first so a budget cut keeps the big wins.
+        # Every policy is evaluated against the same discovery pass.
+        state = RunState(get_run_id(), types_to_clean, tenant_id=self.tenant_id)
+        started: List[str] = []
+        for wave in dependency_waves(types_to_clean, CLEANERS):
+            if budget.exhausted:
+                logging.warning(f"Budget exhausted, not starting: {', '.join(wave)}")
+                break
+            started.extend(wave)
+            discovered = {}
+            with phase("discovery"):
+                for res_type in wave:
+                    if res_type == "resource_group" and self.inventory is not None:
+                        discovered[res_type] = self.inventory.empty_groups()
+                        pending = self.resume_state.pending_ids(res_type) if self.resume_state else None
+                        if pending is not None:
+                            discovered[res_type] = [g for g in discovered[res_type] if g["id"].lower() in pending]
+                    elif issubclass(CLEANERS[res_type], SpecCleaner):
+                        discovered[res_type] = self.snapshot.take(res_type)
+                    else:
+                        cleaner = next(iter(self.cleaners[res_type].values()))
+                        discovered[res_type] = cleaner.discover(subscriptions)
+            self.progress.set_phase(f"cleaning {', '.join(wave)}")
+            self._clean(executor, budget, discovered)
 
-            deleted = len(report["deleted"])
-            failed = len(report["failed"])
-            skipped = len(report["skipped"])
-            action = "Would delete" if self.config.dry_run else "Deleted"
-            logging.info(f"{res_type}: {action} {deleted}, failed {failed}, skipped {skipped}")
+            # Resources orphaned by this wave whose own wave already ran
+            while self.snapshot is not None:
+                orphans = {t: self.snapshot.take(t) for t in started if t in self.snapshot.candidates}
+                if not any(orphans.values()):
+                    break
+                logging.info(f"Cleaning newly orphaned: "
+                             f"{', '.join(f'{len(r)} {t}' for t, r in orphans.items() if r)}")
+                self._clean(executor, budget, orphans)
 
-        self.print_report()
+        if self.resume_state is not None:
+            # Types this run never reached keep the previous run's leftovers
+            state.pending.update({t: ids for t, ids in self.resume_state.pending.items()
+                                  if t in types_to_clean and t not in started})
+            self.resume_state = None  # Used up; a later purge() starts from scratch
+        for res_type in started:
+            leftover = [i for c in self.cleaners[res_type].values()
+                        for outcome in ("deferred", "failed") for i in c.report[outcome]]
+            if leftover:
+                state.pending[res_type] = leftover
+            else:
+                state.completed.append(res_type)
+            for name, cleaner in self.cleaners[res_type].items():
+                report = cleaner.report
+                action = "Would delete" if cleaner.config.dry_run else "Deleted"
+                logging.info(f"[{name}] {res_type}: {action} {len(report['deleted'])}, "
+                             f"failed {len(report['failed'])}, skipped {len(report['skipped'])}, "
+                             f"est. ${report['savings']:.2f}/month")
+
+        if self.config.dry_run:
+            return
+        if state.remaining_types:
+            state.save()
+            logging.warning(f"Run incomplete; {', '.join(state.remaining_types)} left for --resume")
+        else:
+            RunState.clear(self.tenant_id)
 
     def print_report(self):
-        """Print cleanup report."""
+        """Print cleanup report, grouped by policy."""
         print("\n=== Azure Cleanup Report ===")
-        for res_type, results in self.report.items():
-            print(f"\nResource: {res_type}")
-            action = "Would delete" if self.config.dry_run else "Deleted"
-            print(f"  {action}:")
-            if results["deleted"]:
-                for item in results["deleted"][:10]:  # Limit output
-                    print(f"    - {item}")
-                if len(results["deleted"]) > 10:
-                    print(f"    ... and {len(results['deleted']) - 10} more")
-            else:
-                print("    None")
-            if results["failed"]:
-                print("  Failed:")
-                for item in results["failed"][:5]:
-                    print(f"    - {item}")
-            if results["skipped"]:
-                print(f"  Skipped: {len(results['skipped'])}")
+        for name, types in self.report.items():
+            policy = next(p for p in self.policies if p.name == name)
+            if len(self.policies) > 1:
+                mode = "dry-run" if policy.dry_run else "live"
+                print(f"\n## Policy: {name} ({mode})")
+            for res_type, results in types.items():
+                print(f"\nResource: {res_type}")
+                action = "Would delete" if policy.dry_run else "Deleted"
+                print(f"  {action}:")
+                if results["deleted"]:
+                    for item in results["deleted"][:10]:  # Limit output
+                        print(f"    - {item}")
+                    if len(results["deleted"]) > 10:
+                        print(f"    ... and {len(results['deleted']) - 10} more")
+                else:
+                    print("    None")
+                if results["failed"]:
+                    print("  Failed:")
+                    for item in results["failed"][:5]:
+                        print(f"    - {item}")
+                if results["skipped"]:
+                    print(f"  Skipped: {len(results['skipped'])}")
+                if results["deferred"]:
+                    print(f"  Deferred to a later run: {len(results['deferred'])}")
+                if results["savings"]:
+                    print(f"  Estimated savings: ${results['savings']:,.2f}/month")
+            if len(self.policies) > 1:
+                subtotal = sum(r["savings"] for r in types.values())
+                print(f"\n  Policy savings: ${subtotal:,.2f}/month")
+        total = sum(r["savings"] for types in self.report.values() for r in types.values())
+        print(f"\nEstimated total savings: ${total:,.2f}/month")
+
+
+class TenantFanout:
+    """Cleans several tenants concurrently, each with its own credential, clients and run state."""
+
+    def __init__(self, config: Config, resume: bool = False):
+        self.config = config
+        self.resume = resume
+        self.cleaners: Dict[str, AzureResourceCleaner] = {}
+        self.errors: Dict[str, str] = {}
+        self.budget: Optional[RunBudget] = None
+
+    def _tenants(self) -> List[str]:
+        if "all" not in self.config.tenants:
+            return list(dict.fromkeys(self.config.tenants))
+        graph = ResourceGraphQuery(get_credential(persist=self.config.token_cache))
+        return [t["tenant_id"] for t in graph.list_tenants()]
+
+    def _run(self, tenant_id: str) -> None:
+        # One profiler covers the whole fan-out, so tenants don't start their own
+        config = replace(self.config, tenants=[tenant_id], profile=False)
+        state = resume(config, tenant_id) if self.resume else None
+        try:
+            cleaner = AzureResourceCleaner(config, get_credential(self.config.token_cache, tenant_id),
+                                           budget=self.budget, resume_state=state)
+            self.cleaners[tenant_id] = cleaner
+            cleaner.purge(show_report=False)
+        except Exception as e:
+            logging.exception(f"Tenant {tenant_id} failed")
+            self.errors[tenant_id] = str(e)
+
+    def purge(self, show_report: bool = True):
+        """Run every tenant to completion; one failing tenant doesn't stop the others.
+
+        The time budget and delete cap cover the whole fan-out, not each tenant.
+        """
+        self.budget = RunBudget(self.config.time_budget, self.config.max_deletes,
+                                self.config.operation_timeout, self.config.drain_grace)
+        tenants = self._tenants()
+        logging.info(f"Cleaning {len(tenants)} tenant(s)")
+        if self.config.profile:
+            start_profiling(get_run_id())
+        try:
+            with ThreadPoolExecutor(len(tenants) or 1, thread_name_prefix="azurewipe-tenant") as pool:
+                list(pool.map(self._run, tenants))
+            if show_report:
+                with phase("report"):
+                    self.print_report()
+        finally:
+            if self.config.profile:
+                stop_profiling()
+
+    def print_report(self):
+        for tenant_id, cleaner in self.cleaners.items():
+            print(f"\n##### Tenant {tenant_id}")
+            if tenant_id in self.errors:
+                print(f"  Failed: {self.errors[tenant_id]}")
+            cleaner.print_report()
+        for tenant_id in self.errors.keys() - self.cleaners.keys():
+            print(f"\n##### Tenant {tenant_id}\n  Failed: {self.errors[tenant_id]}")
@@ -2,22 +2,65 @@
 import argparse
 import logging
 import time
+from pathlib import Path
 from azurewipe.core.config import load_config
 from azurewipe.core.logging import setup_logging, get_run_id
 
 
 def parse_args():
     parser = argparse.ArgumentParser(description="AzureWipe - Azure Resource Cleanup Tool")
+    parser.add_argument("command", nargs="?", choices=["run", "serve"], default="run",
+                        help="run once (default) or serve: scheduled daemon with a local HTTP API")
     parser.add_argument("--config", "-c", help="Path to YAML config file")
     parser.add_argument("--subscription", "-s", help="Subscription ID (overrides config)")
     parser.add_argument("--resource-group", "-g", help="Resource group (overrides config)")
+    parser.add_argument("--tenant", "-t", action="append", metavar="ID",
+                        help="Tenant to clean, repeatable, or 'all'; tenants run concurrently (overrides config)")
+    parser.add_argument("--management-group", "-m", action="append", metavar="NAME",
+                        help="Query this management group instead of listing subscriptions (repeatable)")
     parser.add_argument("-v", "--verbose", action="count", default=0, help="Verbosity: -v=INFO, -vv=DEBUG")
     parser.add_argument("--json-logs", action="store_true", help="Output logs in JSON format")
     parser.add_argument("--live-run", action="store_true", help="Actually delete resources (default: dry-run)")
+    parser.add_argument("--max-duration", "--time-budget", dest="time_budget", type=float, metavar="SECONDS",
+                        help="Stop starting new deletes after this many seconds (most expensive go first)")
+    parser.add_argument("--max-deletes", type=int, metavar="N", help="Stop starting new deletes after N")
+    parser.add_argument("--operation-timeout", type=float, metavar="SECONDS",
+                        help="Max seconds to wait for a single delete (default: 3600)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue the last incomplete live run with its deferred and failed resources")
+    parser.add_argument("--yes", "-y", action="store_true", help="Skip the live-run countdown (for CI)")
+    parser.add_argument("--executor", choices=["serial", "threads", "processes", "asyncio"],
+                        help="How deletes run within a wave (default: serial)")
+    parser.add_argument("--workers", type=int, metavar="N", help="Concurrent deletes for parallel executors (default: 8)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Profile the run by phase and write a flame-graph stack file")
+    parser.add_argument("--no-token-cache", action="store_true", help="Don't persist tokens between runs")
+    parser.add_argument("--what-if", nargs="+", metavar="CONFIG",
+                        help="Compare what several config files would delete, from one inventory scan")
     parser.add_argument("--interactive", "-i", action="store_true", help="Interactive menu mode")
+    serve = parser.add_argument_group("serve")
+    serve.add_argument("--interval", type=float, default=3600.0, metavar="SECONDS",
+                       help="Seconds between scheduled runs, 0 for API-triggered only (default: 3600)")
+    serve.add_argument("--listen", default="127.0.0.1:8765", metavar="HOST:PORT", help="HTTP API address")
+    serve.add_argument("--socket", metavar="PATH", help="Serve the API on a Unix socket instead")
     return parser.parse_args()
 
 
+def run_what_if(paths, config):
+    from azurewipe.core.auth import get_credential
+    from azurewipe.core.graph import ResourceGraphQuery
+    from azurewipe.planner import InventoryTable, Planner, print_what_if
+
+    configs = {Path(p).stem: load_config(p) for p in paths}
+    graph = ResourceGraphQuery(get_credential(persist=config.token_cache), config.management_groups)
+    if any("all" in c.subscriptions for c in configs.values()):
+        subscriptions = graph.list_subscriptions()
+    else:
+        subscriptions = sorted({s for c in configs.values() for s in c.subscriptions})
+    planner = Planner(InventoryTable.load(graph, subscriptions))
+    print_what_if(planner, configs)
+
+
 def main():
     args = parse_args()
 
@@ -32,21 +75,57 @@ def main():
         config.subscriptions = [args.subscription]
     if args.resource_group:
         config.resource_groups = [args.resource_group]
+    if args.tenant:
+        config.tenants = args.tenant
+    if args.management_group:
+        config.management_groups = args.management_group
     if args.verbose:
         config.verbosity = args.verbose
     if args.json_logs:
         config.json_logs = True
     if args.live_run:
         config.dry_run = False
+    if args.time_budget:
+        config.time_budget = args.time_budget
+    if args.max_deletes is not None:
+        config.max_deletes = args.max_deletes
+    if args.operation_timeout:
+        config.operation_timeout = args.operation_timeout
+    if args.executor:
+        config.executor = args.executor
+    if args.workers:
+        config.workers = args.workers
+    if args.profile:
+        config.profile = True
+    if args.no_token_cache:
+        config.token_cache = False
 
     setup_logging(config.verbosity, config.json_logs)
     logging.info(f"AzureWipe run_id={get_run_id()} dry_run={config.dry_run}")
 
-    from azurewipe.cleaner import AzureResourceCleaner
-    cleaner = AzureResourceCleaner(config)
+    if args.what_if:
+        run_what_if(args.what_if, config)
+        return
+
+    if args.command == "serve":
+        from azurewipe.daemon import Daemon
+        Daemon(config, args.interval).serve(args.listen, args.socket)
+        return
+
+    resume_state = None
+    if args.resume and not config.tenants:
+        from azurewipe.core.state import resume
+        resume_state = resume(config)
+
+    from azurewipe.cleaner import AzureResourceCleaner, TenantFanout
+    if config.tenants:
+        cleaner = TenantFanout(config, resume=args.resume)
+    else:
+        cleaner = AzureResourceCleaner(config, resume_state=resume_state)
 
     if not config.dry_run:
         logging.warning("LIVE RUN MODE - Resources WILL be deleted")
+    if not config.dry_run and not args.yes:
         try:
             for i in range(5, 0, -1):
                 print(f"Starting in {i}s... (Ctrl+C to cancel)", end="\r")
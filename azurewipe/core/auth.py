@@ -1,16 +1,310 @@
 """Azure authentication utilities."""
-from azure.identity import DefaultAzureCredential, AzureCliCredential
-from azure.core.credentials import TokenCredential
+import base64
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+import azure.identity
+from azure.identity import DefaultAzureCredential, AzureCliCredential, CredentialUnavailableError
+from azure.core.credentials import AccessToken, TokenCredential
+from azure.core.exceptions import ClientAuthenticationError
+from azurewipe.core.cache import cache_dir
 
+ARM_SCOPE = "https://management.azure.com/.default"
 
-def get_credential() -> TokenCredential:
-    """Get Azure credential using DefaultAzureCredential chain.
-    
-    Tries in order: Environment → Managed Identity → Azure CLI → Interactive
+# DefaultAzureCredential links that can be rebuilt directly without arguments
+CHAIN_LINKS = (
+    "EnvironmentCredential",
+    "WorkloadIdentityCredential",
+    "ManagedIdentityCredential",
+    "SharedTokenCacheCredential",
+    "AzureCliCredential",
+    "AzurePowerShellCredential",
+    "AzureDeveloperCliCredential",
+)
+
+REFRESH_MARGIN = 300  # Refresh in the background this many seconds before expiry
+MIN_VALIDITY = 30  # Never hand out a token with less lifetime than this
+
+# Environment variables that select which identity a chain link signs in as
+IDENTITY_ENV = ("AZURE_CLIENT_ID", "AZURE_USERNAME", "AZURE_TENANT_ID")
+
+_CREDENTIALS: Dict[Optional[str], "CachedCredential"] = {}  # Tenant ID (None = default) -> credential
+_CREDENTIAL_LOCK = threading.Lock()
+
+
+def get_credential(persist: bool = True, tenant_id: Optional[str] = None) -> TokenCredential:
+    """Get the process-wide cached Azure credential, one per tenant.
+
+    Tries in order: Environment → Managed Identity → Azure CLI → Interactive,
+    then remembers which link worked so later runs skip the probing.
     """
-    return DefaultAzureCredential()
+    with _CREDENTIAL_LOCK:
+        if tenant_id not in _CREDENTIALS:
+            _CREDENTIALS[tenant_id] = CachedCredential(persist=persist, tenant_id=tenant_id)
+        return _CREDENTIALS[tenant_id]
+
+
+def principal(credential: TokenCredential) -> str:
+    """`<tenant>:<object id>` of the identity behind `credential`, from its ARM token claims.
+
+    Falls back to the credential's tenant (or "default") when the token
+    can't be fetched or decoded.
+    """
+    fallback = getattr(credential, "tenant_id", None) or "default"
+    try:
+        payload = credential.get_token(ARM_SCOPE).token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+    except Exception as e:
+        logging.debug(f"Could not read token claims: {e}")
+        return fallback
+    return f"{claims.get('tid', fallback)}:{claims.get('oid', '')}"
 
 
 def get_cli_credential() -> TokenCredential:
     """Get credential from Azure CLI (az login)."""
     return AzureCliCredential()
+
+
+class _TokenStore:
+    """Encrypted on-disk token cache shared between processes and runs.
+
+    Uses the OS keyring-backed encryption from msal-extensions (DPAPI,
+    Keychain, libsecret). If none is available, persistence is disabled
+    rather than falling back to plaintext.
+    """
+
+    def __init__(self):
+        from msal_extensions import CrossPlatLock, build_encrypted_persistence
+        path = cache_dir() / "tokens.bin"
+        self._persistence = build_encrypted_persistence(str(path))
+        self._lock_path = str(path) + ".lock"
+        self._lock_class = CrossPlatLock
+
+    def _read(self) -> Dict[str, list]:
+        try:
+            return json.loads(self._persistence.load() or "{}")
+        except Exception:
+            return {}
+
+    def load(self, key: str) -> Optional[AccessToken]:
+        try:
+            with self._lock_class(self._lock_path):
+                entry = self._read().get(key)
+        except Exception as e:
+            logging.debug(f"Token cache read failed: {e}")
+            return None
+        return AccessToken(*entry) if entry else None
+
+    def clear(self) -> None:
+        try:
+            with self._lock_class(self._lock_path):
+                self._persistence.save("{}")
+        except Exception as e:
+            logging.debug(f"Token cache clear failed: {e}")
+
+    def save(self, key: str, token: AccessToken) -> None:
+        now = time.time()
+        try:
+            with self._lock_class(self._lock_path):
+                data = {k: v for k, v in self._read().items() if v[1] > now}
+                data[key] = [token.token, token.expires_on]
+                self._persistence.save(json.dumps(data))
+        except Exception as e:
+            logging.debug(f"Token cache write failed: {e}")
+
+
+def _open_store() -> Optional[_TokenStore]:
+    try:
+        return _TokenStore()
+    except Exception as e:
+        logging.debug(f"Encrypted token cache unavailable, keeping tokens in memory: {e}")
+        return None
+
+
+_CLI_USER: Tuple[float, str] = (-1.0, "")  # azureProfile.json mtime -> signed-in user
+
+
+def _cli_user() -> str:
+    """User of the default `az login` subscription, re-read only when azureProfile.json changes."""
+    global _CLI_USER
+    path = Path(os.environ.get("AZURE_CONFIG_DIR") or Path.home() / ".azure") / "azureProfile.json"
+    try:
+        mtime = path.stat().st_mtime
+        if mtime == _CLI_USER[0]:
+            return _CLI_USER[1]
+        profile = json.loads(path.read_text(encoding="utf-8-sig"))
+    except (OSError, ValueError):
+        return ""
+    user = next((s.get("user", {}).get("name", "") for s in profile.get("subscriptions", [])
+                 if s.get("isDefault")), "")
+    _CLI_USER = (mtime, user)
+    return user
+
+
+def _identity_hint() -> str:
+    """Who the credential chain would sign in as, so cached tokens never cross identities."""
+    return ",".join([os.environ.get(name, "") for name in IDENTITY_ENV] + [_cli_user()])
+
+
+def _load_link() -> Optional[str]:
+    try:
+        name = json.loads((cache_dir() / "credential.json").read_text()).get("link")
+    except (OSError, ValueError):
+        return None
+    return name if name in CHAIN_LINKS else None
+
+
+def _save_link(name: Optional[str]) -> None:
+    try:
+        (cache_dir() / "credential.json").write_text(json.dumps({"link": name}))
+    except OSError as e:
+        logging.debug(f"Could not remember credential link: {e}")
+
+
+class CachedCredential:
+    """TokenCredential with a shared, early-refreshing token cache.
+
+    Tokens are cached per scope/tenant and shared by all threads. When a
+    token gets close to expiry it keeps being served while a background
+    thread fetches its replacement, so callers never wait on `az` or IMDS.
+    With `tenant_id`, tokens are requested for that tenant unless a call
+    asks for another one.
+    """
+
+    def __init__(self, persist: bool = True, tenant_id: Optional[str] = None):
+        self.tenant_id = tenant_id
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._tokens: Dict[str, AccessToken] = {}
+        self._refreshing: set = set()
+        self._inner: Optional[TokenCredential] = None
+        self._link = _load_link()
+        self._store = _open_store() if persist else None
+
+    def _build_inner(self) -> TokenCredential:
+        # Tokens for a tenant other than the login's home tenant must be allowed explicitly
+        kwargs = {"additionally_allowed_tenants": ["*"]} if self.tenant_id else {}
+        if self._link:
+            logging.debug(f"Using remembered credential {self._link}")
+            if self._link == "ManagedIdentityCredential" and os.environ.get("AZURE_CLIENT_ID"):
+                # The chain picks a user-assigned identity from the environment; keep doing so
+                kwargs["client_id"] = os.environ["AZURE_CLIENT_ID"]
+            return getattr(azure.identity, self._link)(**kwargs)
+        return DefaultAzureCredential(**kwargs)
+
+    def _credential(self) -> TokenCredential:
+        with self._lock:
+            if self._inner is None:
+                self._inner = self._build_inner()
+            return self._inner
+
+    def _remember_link(self, inner: TokenCredential) -> None:
+        if self._link or not isinstance(inner, DefaultAzureCredential):
+            return
+        # Private in azure-identity; without it, keep probing the chain every run
+        successful = getattr(inner, "_successful_credential", None)
+        if successful is None:
+            logging.debug("Cannot tell which credential link succeeded, not remembering it")
+            return
+        name = type(successful).__name__
+        if name in CHAIN_LINKS:
+            self._link = name
+            _save_link(name)
+            self._clear_store()
+
+    def _clear_store(self) -> None:
+        # Tokens persisted under another link may belong to another identity
+        if self._store:
+            self._store.clear()
+
+    def _acquire(self, scopes: Tuple[str, ...], **kwargs) -> AccessToken:
+        inner = self._credential()
+        try:
+            token = inner.get_token(*scopes, **kwargs)
+        except (CredentialUnavailableError, ClientAuthenticationError):
+            if not self._link:
+                raise
+            logging.info(f"Remembered credential {self._link} failed, probing full chain")
+            with self._lock:
+                self._link = None
+                self._inner = self._build_inner()
+            _save_link(None)
+            self._clear_store()
+            return self._acquire(scopes, **kwargs)
+        self._remember_link(inner)
+        return token
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _refresh(self, key: str, scopes: Tuple[str, ...], kwargs: dict) -> None:
+        try:
+            with self._key_lock(key):
+                token = self._acquire(scopes, **kwargs)
+                self._tokens[key] = token
+            if self._store:
+                self._store.save(key, token)
+        except Exception as e:
+            logging.warning(f"Background token refresh failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _refresh_async(self, key: str, scopes: Tuple[str, ...], kwargs: dict) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        threading.Thread(target=self._refresh, args=(key, scopes, kwargs), daemon=True).start()
+
+    def get_token(self, *scopes: str, claims: Optional[str] = None,
+                  tenant_id: Optional[str] = None, **kwargs) -> AccessToken:
+        tenant_id = tenant_id or self.tenant_id
+        if tenant_id:
+            kwargs["tenant_id"] = tenant_id
+        if claims:
+            # Claims challenges (CAE) always need a fresh token
+            return self._acquire(scopes, claims=claims, **kwargs)
+
+        key = f"{self._link or 'chain'}|{_identity_hint()}|{tenant_id or ''}|{' '.join(sorted(scopes))}"
+        token = self._tokens.get(key)
+        if token and token.expires_on - time.time() > REFRESH_MARGIN:
+            return token
+        if token and token.expires_on - time.time() > MIN_VALIDITY:
+            self._refresh_async(key, scopes, kwargs)
+            return token
+
+        with self._key_lock(key):
+            token = self._tokens.get(key)
+            if token and token.expires_on - time.time() > MIN_VALIDITY:
+                return token
+            token = self._store.load(key) if self._store else None
+            if token and token.expires_on - time.time() > REFRESH_MARGIN:
+                self._tokens[key] = token
+                return token
+            token = self._acquire(scopes, **kwargs)
+            self._tokens[key] = token
+        if self._store:
+            self._store.save(key, token)
+        return token
+
+    def warm(self, *scopes: str) -> None:
+        """Fetch a token in the background so the first API call doesn't wait."""
+        scopes = scopes or (ARM_SCOPE,)
+
+        def _warm():
+            try:
+                self.get_token(*scopes)
+            except Exception as e:
+                logging.debug(f"Token prefetch failed: {e}")
+
+        threading.Thread(target=_warm, daemon=True).start()
+
+    def close(self) -> None:
+        if self._inner is not None and hasattr(self._inner, "close"):
+            self._inner.close()
@@ -0,0 +1,13 @@
+"""Local cache directory shared across runs and processes."""
+import os
+from pathlib import Path
+
+
+def cache_dir() -> Path:
+    """Return the azurewipe cache directory, creating it if needed.
+
+    Defaults to ~/.cache/azurewipe; override with AZUREWIPE_CACHE_DIR.
+    """
+    path = Path(os.environ.get("AZUREWIPE_CACHE_DIR") or Path.home() / ".cache" / "azurewipe")
+    path.mkdir(mode=0o700, parents=True, exist_ok=True)
+    return path
@@ -0,0 +1,24 @@
+"""Shared Azure management clients, one per class/credential/subscription."""
+import threading
+from typing import Any, Dict, Optional, Tuple
+from azure.core.credentials import TokenCredential
+from azurewipe.core.retry import BudgetedRetryPolicy
+
+_CLIENTS: Dict[Tuple[type, TokenCredential, Optional[str]], Any] = {}
+_LOCK = threading.Lock()
+
+
+def get_client(client_class: type, credential: TokenCredential, subscription_id: Optional[str] = None) -> Any:
+    """Return a cached client using the shared retry budget.
+
+    SDK clients are safe to share between threads, and reusing them keeps
+    HTTP connections warm across deletes in the same subscription.
+    """
+    key = (client_class, credential, subscription_id)
+    with _LOCK:
+        client = _CLIENTS.get(key)
+        if client is None:
+            args = (credential, subscription_id) if subscription_id else (credential,)
+            client = client_class(*args, retry_policy=BudgetedRetryPolicy(credential=credential))
+            _CLIENTS[key] = client
+        return client
@@ -1,10 +1,43 @@
 """YAML configuration loader."""
 import fnmatch
-from dataclasses import dataclass, field
+import json
+import re
+from datetime import datetime, timezone
+from dataclasses import dataclass, field, replace
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Union
 import yaml
 
+_DURATION_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([smhdw])\s*$")
+_DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+_FRACTION_RE = re.compile(r"(\.\d{6})\d+")
+
+
+def parse_duration(value: Union[str, int, float, None]) -> Optional[float]:
+    """Parse "7d", "12h", "30m", "2w" or "90s" into seconds; the unit is required."""
+    if value is None:
+        return None
+    match = _DURATION_RE.match(str(value))
+    if not match:
+        raise ValueError(f"Invalid duration: {value!r} (expected a number with a unit, e.g. 7d, 12h, 30m)")
+    return float(match.group(1)) * _DURATION_UNITS[match.group(2)]
+
+
+@lru_cache(maxsize=8192)
+def parse_timestamp(value: Optional[str]) -> Optional[float]:
+    """Parse an ISO 8601 timestamp or date into epoch seconds (UTC if no offset), or None."""
+    if not value:
+        return None
+    text = _FRACTION_RE.sub(r"\1", str(value).strip()).replace("Z", "+00:00")
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
 
 @dataclass
 class TagFilters:
@@ -12,6 +45,27 @@ class TagFilters:
     exclude: Dict[str, List[str]] = field(default_factory=dict)
 
 
+# Fields a policy may set; anything it leaves out is inherited from the top level
+POLICY_FIELDS = (
+    "subscriptions", "resource_groups", "resource_types", "tag_filters", "exclude_patterns",
+    "min_age", "min_idle", "expiry_tag",
+)
+
+
+@dataclass
+class Policy:
+    name: str
+    subscriptions: Optional[List[str]] = None
+    resource_groups: Optional[List[str]] = None
+    resource_types: Optional[List[str]] = None
+    tag_filters: Optional[TagFilters] = None
+    exclude_patterns: Optional[List[str]] = None
+    min_age: Optional[float] = None
+    min_idle: Optional[float] = None
+    expiry_tag: Optional[str] = None
+    dry_run: bool = False  # Report-only even when the run is live
+
+
 @dataclass
 class Config:
     subscriptions: List[str] = field(default_factory=lambda: ["all"])
@@ -19,21 +73,56 @@ class Config:
     resource_types: List[str] = field(default_factory=lambda: ["all"])
     tag_filters: TagFilters = field(default_factory=TagFilters)
     exclude_patterns: List[str] = field(default_factory=list)
+    tenants: List[str] = field(default_factory=list)  # Cleaned concurrently; empty = login tenant, "all" = every one
+    management_groups: List[str] = field(default_factory=list)  # Query these instead of listing subscriptions
     dry_run: bool = True
     json_logs: bool = False
     verbosity: int = 0
+    token_cache: bool = True
+    time_budget: Optional[float] = None  # Seconds; stop starting deletes after this
+    max_deletes: Optional[int] = None  # Stop starting deletes after this many
+    operation_timeout: Optional[float] = 3600.0  # Max seconds to wait on one delete
+    drain_grace: float = 60.0  # Extra wait for the in-flight delete once time_budget runs out
+    executor: str = "serial"  # serial, threads, processes or asyncio
+    workers: int = 8  # Concurrent deletes for the parallel executors
+    profile: bool = False  # Write per-phase profiles and a flame graph for the run
+    min_age: Optional[float] = None  # Seconds since creation (createdAt)
+    min_idle: Optional[float] = None  # Seconds since last attach/detach (idleSince)
+    expiry_tag: Optional[str] = None  # Only delete once this tag's date has passed
+    name: str = "default"
+    policies: List[Policy] = field(default_factory=list)  # Checked in order; first match wins
+    # For a resolved policy: the top-level config, whose subscriptions,
+    # resource groups and types still bound it (e.g. after --resource-group)
+    within: Optional["Config"] = None
+
+    def resolve_policies(self) -> List["Config"]:
+        """One Config per policy with unset fields taken from this one, or [self] without policies."""
+        if not self.policies:
+            return [self]
+        resolved = []
+        for policy in self.policies:
+            overrides = {f: getattr(policy, f) for f in POLICY_FIELDS if getattr(policy, f) is not None}
+            resolved.append(replace(self, name=policy.name, policies=[], within=self,
+                                    dry_run=self.dry_run or policy.dry_run, **overrides))
+        return resolved
 
     def should_include_subscription(self, sub_id: str) -> bool:
+        if self.within is not None and not self.within.should_include_subscription(sub_id):
+            return False
         if "all" in self.subscriptions:
             return True
-        return sub_id in self.subscriptions
+        return sub_id.lower() in (s.lower() for s in self.subscriptions)
 
     def should_include_rg(self, rg_name: str) -> bool:
+        if self.within is not None and not self.within.should_include_rg(rg_name):
+            return False
         if "all" in self.resource_groups:
             return True
         return any(fnmatch.fnmatch(rg_name, p) for p in self.resource_groups)
 
     def should_include_resource_type(self, res_type: str) -> bool:
+        if self.within is not None and not self.within.should_include_resource_type(res_type):
+            return False
         if "all" in self.resource_types:
             return True
         return res_type in self.resource_types
@@ -53,6 +142,33 @@ class Config:
     def matches_exclude_pattern(self, name: str) -> bool:
         return any(fnmatch.fnmatch(name, p) for p in self.exclude_patterns)
 
+    def matches_lifetime(self, resource: Dict[str, Any], now: float) -> bool:
+        """Check age, idle time and expiry tag; a missing or unparseable timestamp never matches."""
+        if self.min_age is not None:
+            created = parse_timestamp(resource.get("createdAt"))
+            if created is None or now - created < self.min_age:
+                return False
+        if self.min_idle is not None:
+            idle_since = parse_timestamp(resource.get("idleSince"))
+            if idle_since is None or now - idle_since < self.min_idle:
+                return False
+        if self.expiry_tag:
+            expires = parse_timestamp((resource.get("tags") or {}).get(self.expiry_tag))
+            if expires is None or expires > now:
+                return False
+        return True
+
+    def lifetime_kql(self) -> Optional[str]:
+        """The lifetime rules as a KQL condition over discovery columns, for pushdown."""
+        parts = []
+        if self.min_age is not None:
+            parts.append(f"createdAt < ago({int(self.min_age)}s)")
+        if self.min_idle is not None:
+            parts.append(f"idleSince < ago({int(self.min_idle)}s)")
+        if self.expiry_tag:
+            parts.append(f"todatetime(tags[{json.dumps(self.expiry_tag)}]) < now()")
+        return " and ".join(parts) or None
+
 
 def load_config(path: Optional[str] = None) -> Config:
     if path is None:
@@ -65,19 +181,69 @@ def load_config(path: Optional[str] = None) -> Config:
     return _parse_config(data)
 
 
-def _parse_config(data: Dict[str, Any]) -> Config:
-    tag_data = data.get("tag_filters", {})
-    tag_filters = TagFilters(
+def _parse_tag_filters(tag_data: Dict[str, Any]) -> TagFilters:
+    return TagFilters(
         include=tag_data.get("include", {}),
         exclude=tag_data.get("exclude", {}),
     )
-    return Config(
+
+
+def _parse_policies(items: List[Dict[str, Any]]) -> List[Policy]:
+    policies = []
+    for i, item in enumerate(items):
+        name = str(item.get("name") or f"policy-{i + 1}")
+        if any(p.name == name for p in policies):
+            raise ValueError(f"Duplicate policy name: {name}")
+        policies.append(Policy(
+            name=name,
+            subscriptions=item.get("subscriptions"),
+            resource_groups=item.get("resource_groups"),
+            resource_types=item.get("resource_types"),
+            tag_filters=_parse_tag_filters(item["tag_filters"]) if "tag_filters" in item else None,
+            exclude_patterns=item.get("exclude_patterns"),
+            min_age=parse_duration(item.get("min_age")),
+            min_idle=parse_duration(item.get("min_idle")),
+            expiry_tag=item.get("expiry_tag"),
+            dry_run=item.get("dry_run", False),
+        ))
+    return policies
+
+
+def _check_lifetime(config: Config) -> None:
+    """Reject age rules on resource groups: they have no creation time, so nothing would match."""
+    for policy in config.resolve_policies():
+        ages = [f for f in ("min_age", "min_idle") if getattr(policy, f) is not None]
+        if ages and "resource_group" in policy.resource_types:
+            where = f"policy {policy.name!r}" if config.policies else "config"
+            raise ValueError(f"{where}: {' and '.join(ages)} can't apply to resource_group "
+                             f"(resource groups have no creation time); use expiry_tag instead")
+
+
+def _parse_config(data: Dict[str, Any]) -> Config:
+    tag_filters = _parse_tag_filters(data.get("tag_filters", {}))
+    config = Config(
         subscriptions=data.get("subscriptions", ["all"]),
         resource_groups=data.get("resource_groups", ["all"]),
         resource_types=data.get("resource_types", ["all"]),
         tag_filters=tag_filters,
         exclude_patterns=data.get("exclude_patterns", []),
+        tenants=data.get("tenants", []),
+        management_groups=data.get("management_groups", []),
         dry_run=data.get("dry_run", True),
         json_logs=data.get("json_logs", False),
         verbosity=data.get("verbosity", 0),
+        token_cache=data.get("token_cache", True),
+        time_budget=data.get("time_budget", data.get("max_duration")),
+        max_deletes=data.get("max_deletes"),
+        operation_timeout=data.get("operation_timeout", 3600.0),
+        drain_grace=data.get("drain_grace", 60.0),
+        executor=data.get("executor", "serial"),
+        workers=data.get("workers", 8),
+        profile=data.get("profile", False),
+        min_age=parse_duration(data.get("min_age")),
+        min_idle=parse_duration(data.get("min_idle")),
+        expiry_tag=data.get("expiry_tag"),
+        policies=_parse_policies(data.get("policies") or []),
     )
+    _check_lifetime(config)
+    return config
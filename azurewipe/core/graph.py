@@ -1,82 +1,264 @@
 """Azure Resource Graph queries for resource discovery."""
+import json
 import logging
-from typing import List, Dict, Any, Optional
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
 from azure.mgmt.resourcegraph import ResourceGraphClient
 from azure.mgmt.resourcegraph.models import QueryRequest, QueryRequestOptions
 from azure.mgmt.resource import SubscriptionClient
 from azure.core.credentials import TokenCredential
+from azurewipe.core.auth import principal
+from azurewipe.core.cache import cache_dir
+from azurewipe.core.clients import get_client
 
 # KQL queries for orphaned resources
 QUERIES = {
-    "unattached_disks": """
-        Resources
-        | where type =~ 'microsoft.compute/disks'
-        | where managedBy == '' or isnull(managedBy)
-        | where properties.diskState =~ 'Unattached'
-        | project id, name, resourceGroup, subscriptionId, location, tags
-    """,
-    "orphan_nics": """
-        Resources
-        | where type =~ 'microsoft.network/networkinterfaces'
-        | where isnull(properties.virtualMachine)
-        | project id, name, resourceGroup, subscriptionId, location, tags
+    "empty_resource_groups": """
+        ResourceContainers
+        | where type =~ 'microsoft.resources/subscriptions/resourcegroups'{scope}
+        | extend rgKey = tolower(name)
+        | join kind=leftouter (
+            Resources | summarize count() by rgKey = tolower(resourceGroup), subscriptionId
+        ) on rgKey, subscriptionId
+        | where isnull(count_) or count_ == 0
+        | project id, name, resourceGroup = name, subscriptionId, location, tags
     """,
-    "unused_public_ips": """
-        Resources
-        | where type =~ 'microsoft.network/publicipaddresses'
-        | where isnull(properties.ipConfiguration)
-        | project id, name, resourceGroup, subscriptionId, location, tags
+    "resource_groups": """
+        ResourceContainers
+        | where type =~ 'microsoft.resources/subscriptions/resourcegroups'{scope}
+        | project id, name, resourceGroup = name, subscriptionId, location, tags
     """,
-    "unused_nsgs": """
+    # Child resources (extensions etc.) go with their parent, so only
+    # top-level types decide whether a group is empty
+    "resource_group_counts": """
         Resources
-        | where type =~ 'microsoft.network/networksecuritygroups'
-        | where isnull(properties.networkInterfaces) or array_length(properties.networkInterfaces) == 0
-        | where isnull(properties.subnets) or array_length(properties.subnets) == 0
-        | project id, name, resourceGroup, subscriptionId, location, tags
+        | where array_length(split(type, '/')) == 2{scope}
+        | summarize count() by subscriptionId, resourceGroup = tolower(resourceGroup)
     """,
-    "all_vms": """
+    "resource_counts": """
         Resources
-        | where type =~ 'microsoft.compute/virtualmachines'
-        | project id, name, resourceGroup, subscriptionId, location, tags, properties
+        | summarize count() by subscriptionId
     """,
-    "empty_resource_groups": """
+    # Run at tenant (or management group) scope, so it needs no subscription list
+    "subscriptions": """
         ResourceContainers
-        | where type =~ 'microsoft.resources/subscriptions/resourcegroups'
-        | join kind=leftouter (
-            Resources | summarize count() by resourceGroup, subscriptionId
-        ) on $left.name == $right.resourceGroup and $left.subscriptionId == $right.subscriptionId
-        | where isnull(count_) or count_ == 0
-        | project id, name, subscriptionId, location, tags
+        | where type =~ 'microsoft.resources/subscriptions'
+        | project subscriptionId, name, tenantId, state = tostring(properties.state),
+            managementGroups = properties.managementGroupAncestorsChain
     """,
 }
 
+# Columns every discovery query returns. The `properties` bag is left out on
+# purpose: it is often several KB per resource and no cleaner needs it.
+BASE_COLUMNS = "id, name, type, resourceGroup, subscriptionId, location, tags"
+
+# Creation and last attach/detach times for lifetime rules. Types without
+# a detach time (everything but disks) count as idle since creation.
+TIMESTAMP_COLUMNS = (
+    "createdAt = coalesce(todatetime(properties.timeCreated), todatetime(properties.creationTime),"
+    " todatetime(properties.createdTime)),"
+    " idleSince = coalesce(todatetime(properties.LastOwnershipUpdateTime), todatetime(properties.timeCreated),"
+    " todatetime(properties.creationTime), todatetime(properties.createdTime))"
+)
+
+
+def build_discovery_query(specs: List[Any], conditions: Optional[Dict[str, str]] = None,
+                          holders: bool = False) -> str:
+    """Build one KQL query that finds candidates for several cleaner specs.
+
+    Each row is tagged with the matching spec's resource_type in `_kind`,
+    so adding a type adds a `case()` branch instead of another scan.
+    `conditions` adds a per-type KQL filter (e.g. lifetime rules) to its
+    branch; it may reference the TIMESTAMP_COLUMNS.
+
+    With `holders`, resources of specs that declare `holders` are also
+    returned while still in use (`_kind` empty), with whatever holds them
+    in `_held`, so a snapshot can tell when they become orphaned.
+    """
+    conditions = conditions or {}
+    arm_types = ", ".join(f"'{spec.arm_type}'" for spec in specs)
+    branches = ", ".join(
+        f"type =~ '{spec.arm_type}' and ({spec.predicate})"
+        + (f" and ({conditions[spec.resource_type]})" if spec.resource_type in conditions else "")
+        + f", '{spec.resource_type}'"
+        for spec in specs
+    )
+    fields: Dict[str, str] = {}
+    for spec in specs:
+        for alias, expr in spec.fields.items():
+            if fields.setdefault(alias, expr) != expr:
+                raise ValueError(f"Conflicting definitions for projected field {alias!r}")
+    extra = "".join(f", {alias} = {expr}" for alias, expr in fields.items())
+    held = [spec for spec in specs if holders and spec.holders]
+    if not held:
+        return f"""
+        Resources
+        | where type in~ ({arm_types})
+        | extend {TIMESTAMP_COLUMNS}
+        | extend _kind = case({branches}, '')
+        | where _kind != ''
+        | project {BASE_COLUMNS}, createdAt, idleSince, _kind{extra}
+    """
+    held_branches = ", ".join(
+        f"type =~ '{spec.arm_type}' and not({spec.predicate}), {spec.holders}" for spec in held
+    )
+    return f"""
+        Resources
+        | where type in~ ({arm_types})
+        | extend {TIMESTAMP_COLUMNS}
+        | extend _kind = case({branches}, '')
+        | extend _held = case({held_branches}, dynamic(null))
+        | where _kind != '' or isnotnull(_held)
+        | project {BASE_COLUMNS}, createdAt, idleSince, _kind, _held{extra}
+    """
+
+
+def _regex_filter(column: str, regex: Optional[str]) -> str:
+    """KQL line restricting `column` to an RE2 pattern, or nothing."""
+    return f"\n        | where {column} matches regex @'{regex}'" if regex else ""
+
+
+# Resource Graph accepts at most this many subscriptions per request;
+# longer lists are split and the batches queried concurrently
+SUBSCRIPTION_BATCH = 1000
+FANOUT_WORKERS = 8
+
+# Subscription and tenant metadata, per process and on disk between runs
+DIRECTORY_FILE = "directory.json"
+DIRECTORY_TTL = 3600.0  # Seconds before cached listings are fetched again
+_DIRECTORY_CACHE: Dict[str, Tuple[float, List[Dict[str, Any]]]] = {}  # Key -> (saved_at, items)
+_DIRECTORY_LOCKS: Dict[str, threading.Lock] = {}  # Per listing, so tenants fetch concurrently
+_DIRECTORY_LOCK = threading.Lock()  # Guards the lock table and the file
+
+
+def _read_directory() -> Dict[str, Any]:
+    try:
+        return json.loads((cache_dir() / DIRECTORY_FILE).read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def _cached_listing(key: str, fetch, refresh: bool = False) -> List[Dict[str, Any]]:
+    """A listing from memory or disk if younger than DIRECTORY_TTL, else from `fetch()`."""
+    with _DIRECTORY_LOCK:
+        lock = _DIRECTORY_LOCKS.setdefault(key, threading.Lock())
+    with lock:
+        cached = None if refresh else _DIRECTORY_CACHE.get(key)
+        if cached and time.time() - cached[0] < DIRECTORY_TTL:
+            return list(cached[1])
+        with _DIRECTORY_LOCK:
+            entry = None if refresh else _read_directory().get(key)
+        if entry and time.time() - entry["saved_at"] < DIRECTORY_TTL:
+            saved_at, items = entry["saved_at"], entry["items"]
+        else:
+            saved_at, items = time.time(), fetch()
+            with _DIRECTORY_LOCK:
+                data = _read_directory()
+                data[key] = {"saved_at": saved_at, "items": items}
+                path = cache_dir() / DIRECTORY_FILE
+                tmp = path.with_suffix(f".{os.getpid()}.tmp")
+                try:
+                    tmp.write_text(json.dumps(data))
+                    tmp.replace(path)
+                except OSError as e:
+                    logging.debug(f"Could not cache {key}: {e}")
+        _DIRECTORY_CACHE[key] = (saved_at, items)
+        return list(items)
+
 
 class ResourceGraphQuery:
-    """Azure Resource Graph client wrapper."""
+    """Azure Resource Graph client wrapper.
+
+    With `management_groups`, queries that are not given subscriptions run
+    at management group scope and never list subscriptions.
+    """
 
-    def __init__(self, credential: TokenCredential):
+    def __init__(self, credential: TokenCredential, management_groups: Optional[List[str]] = None):
         self.credential = credential
-        self.graph_client = ResourceGraphClient(credential)
-        self.subscription_client = SubscriptionClient(credential)
+        self.management_groups = management_groups or None
+        self._principal: Optional[str] = None
+        self.graph_client = get_client(ResourceGraphClient, credential)
+        self.subscription_client = get_client(SubscriptionClient, credential)
+
+    @property
+    def principal(self) -> str:
+        """Signed-in identity; cached listings are keyed by it, since access differs per identity."""
+        if self._principal is None:
+            self._principal = principal(self.credential)
+        return self._principal
+
+    def list_subscription_details(self, refresh: bool = False) -> List[Dict[str, Any]]:
+        """List accessible subscriptions with display names, states, tenants and management groups."""
+        scope = ",".join(self.management_groups or [])
+        return _cached_listing(f"subscriptions:{self.principal}:{scope}",
+                               self._fetch_subscriptions, refresh)
+
+    def _fetch_subscriptions(self) -> List[Dict[str, Any]]:
+        rows = self._query_scope(QUERIES["subscriptions"], None, self.management_groups)
+        return [
+            {
+                "subscription_id": row["subscriptionId"],
+                "display_name": row["name"] or row["subscriptionId"],
+                "state": row["state"] or "",
+                "tenant_id": row["tenantId"] or "",
+                "management_groups": [mg["name"] for mg in row.get("managementGroups") or []],
+            }
+            for row in rows
+        ]
+
+    def list_tenants(self, refresh: bool = False) -> List[Dict[str, str]]:
+        """List the tenants the credential can access."""
+        return _cached_listing(f"tenants:{self.principal}", lambda: [
+            {"tenant_id": t.tenant_id, "display_name": t.display_name or t.tenant_id}
+            for t in self.subscription_client.tenants.list()
+        ], refresh)
 
     def list_subscriptions(self) -> List[str]:
         """List all accessible subscription IDs."""
-        subs = []
-        for sub in self.subscription_client.subscriptions.list():
-            if sub.state == "Enabled":
-                subs.append(sub.subscription_id)
+        subs = [s["subscription_id"] for s in self.list_subscription_details() if s["state"] == "Enabled"]
         logging.info(f"Found {len(subs)} enabled subscriptions")
         return subs
 
+    def count_resources(self, subscriptions: List[str]) -> Dict[str, int]:
+        """Count resources per subscription."""
+        rows = self.query(QUERIES["resource_counts"], subscriptions)
+        counts = {sub: 0 for sub in subscriptions}
+        for row in rows:
+            counts[row["subscriptionId"]] = row["count_"]
+        return counts
+
     def query(
         self,
         query: str,
         subscriptions: Optional[List[str]] = None,
     ) -> List[Dict[str, Any]]:
-        """Execute a Resource Graph query with pagination."""
+        """Execute a Resource Graph query with pagination.
+
+        Without `subscriptions` the query runs over the management groups,
+        if any, else over every enabled subscription. Lists longer than
+        SUBSCRIPTION_BATCH are queried in concurrent batches. Aggregations
+        must group by subscriptionId to stay correct across batches.
+        """
+        if subscriptions is None and self.management_groups:
+            return self._query_scope(query, None, self.management_groups)
         if subscriptions is None:
             subscriptions = self.list_subscriptions()
+        if not subscriptions:
+            return []  # An empty list would otherwise run at tenant scope
+        batches = [subscriptions[i:i + SUBSCRIPTION_BATCH]
+                   for i in range(0, len(subscriptions), SUBSCRIPTION_BATCH)]
+        if len(batches) <= 1:
+            return self._query_scope(query, subscriptions)
+        with ThreadPoolExecutor(min(FANOUT_WORKERS, len(batches)), thread_name_prefix="azurewipe-arg") as pool:
+            pages = list(pool.map(lambda batch: self._query_scope(query, batch), batches))
+        return [row for page in pages for row in page]
 
+    def _query_scope(self, query: str, subscriptions: Optional[List[str]],
+                     management_groups: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Page through one request; with neither scope given it runs at tenant scope."""
         results = []
         skip_token = None
 
@@ -87,6 +269,7 @@ class ResourceGraphQuery:
             )
             request = QueryRequest(
                 subscriptions=subscriptions,
+                management_groups=management_groups,
                 query=query,
                 options=options,
             )
@@ -99,20 +282,36 @@ class ResourceGraphQuery:
 
         return results
 
-    def find_unattached_disks(self, subscriptions: Optional[List[str]] = None) -> List[Dict]:
-        return self.query(QUERIES["unattached_disks"], subscriptions)
-
-    def find_orphan_nics(self, subscriptions: Optional[List[str]] = None) -> List[Dict]:
-        return self.query(QUERIES["orphan_nics"], subscriptions)
+    def discover(self, specs: List[Any], subscriptions: Optional[List[str]] = None,
+                 conditions: Optional[Dict[str, str]] = None) -> Dict[str, List[Dict]]:
+        """Run one batched discovery query for several cleaner specs."""
+        found: Dict[str, List[Dict]] = {spec.resource_type: [] for spec in specs}
+        if not specs:
+            return found
+        for row in self.query(build_discovery_query(specs, conditions), subscriptions):
+            found[row.pop("_kind")].append(row)
+        return found
 
-    def find_unused_public_ips(self, subscriptions: Optional[List[str]] = None) -> List[Dict]:
-        return self.query(QUERIES["unused_public_ips"], subscriptions)
+    def snapshot(self, specs: List[Any], subscriptions: Optional[List[str]] = None,
+                 conditions: Optional[Dict[str, str]] = None) -> List[Dict]:
+        """Candidates for all specs plus in-use resources with their holders, in one query."""
+        if not specs:
+            return []
+        return self.query(build_discovery_query(specs, conditions, holders=True), subscriptions)
 
-    def find_unused_nsgs(self, subscriptions: Optional[List[str]] = None) -> List[Dict]:
-        return self.query(QUERIES["unused_nsgs"], subscriptions)
+    def find_empty_resource_groups(self, subscriptions: Optional[List[str]] = None,
+                                   name_regex: Optional[str] = None) -> List[Dict]:
+        """Full join of groups against resource counts; prefer Inventory when one is loaded."""
+        query = QUERIES["empty_resource_groups"].format(scope=_regex_filter("name", name_regex))
+        return self.query(query, subscriptions)
 
-    def find_all_vms(self, subscriptions: Optional[List[str]] = None) -> List[Dict]:
-        return self.query(QUERIES["all_vms"], subscriptions)
+    def list_resource_groups(self, subscriptions: Optional[List[str]] = None,
+                             name_regex: Optional[str] = None) -> List[Dict]:
+        query = QUERIES["resource_groups"].format(scope=_regex_filter("name", name_regex))
+        return self.query(query, subscriptions)
 
-    def find_empty_resource_groups(self, subscriptions: Optional[List[str]] = None) -> List[Dict]:
-        return self.query(QUERIES["empty_resource_groups"], subscriptions)
+    def count_by_resource_group(self, subscriptions: Optional[List[str]] = None,
+                                name_regex: Optional[str] = None) -> List[Dict]:
+        """Top-level resource count per (subscriptionId, lowercased resourceGroup)."""
+        query = QUERIES["resource_group_counts"].format(scope=_regex_filter("resourceGroup", name_regex))
+        return self.query(query, subscriptions)
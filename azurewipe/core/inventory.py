@@ -0,0 +1,153 @@
+"""Run-wide resource inventory for answering emptiness and orphan questions without re-querying."""
+import logging
+import re
+import threading
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from azurewipe.core.graph import ResourceGraphQuery
+
+
+def glob_regex(patterns: List[str]) -> Optional[str]:
+    """Case-insensitive RE2 pattern matching any of the globs, or None for no filter.
+
+    Used to push `resource_groups` down into KQL. It only needs to be a
+    superset; exact fnmatch semantics are re-applied client-side. Patterns
+    with character classes are not translated and disable the push-down.
+    """
+    if not patterns or "all" in patterns or any("[" in p for p in patterns):
+        return None
+    parts = [re.escape(p).replace(r"\*", ".*").replace(r"\?", ".") for p in patterns]
+    return f"(?i)^({'|'.join(parts)})$"
+
+
+class Inventory:
+    """Top-level resource counts per resource group, kept current as deletes complete.
+
+    Loaded once per run from two aggregated queries scoped to the
+    configured resource groups. Cleaners report each deletion through
+    `remove()`, so groups emptied earlier in the run are found without
+    waiting for Resource Graph to catch up.
+    """
+
+    def __init__(self, groups: List[Dict[str, Any]], counts: Dict[Tuple[str, str], int]):
+        self.groups = {_key(g["subscriptionId"], g["name"]): g for g in groups}
+        self.counts = counts
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, graph: ResourceGraphQuery, subscriptions: List[str],
+             patterns: Optional[List[str]] = None) -> "Inventory":
+        regex = glob_regex(patterns or ["all"])
+        groups = graph.list_resource_groups(subscriptions, regex)
+        counts = {
+            _key(row["subscriptionId"], row["resourceGroup"]): row["count_"]
+            for row in graph.count_by_resource_group(subscriptions, regex)
+        }
+        logging.info(f"Inventory: {len(groups)} resource groups, {sum(counts.values())} resources")
+        return cls(groups, counts)
+
+    def remove(self, resource: Dict[str, Any]) -> None:
+        """Account for a deleted top-level resource."""
+        key = _key(resource.get("subscriptionId", ""), resource.get("resourceGroup", ""))
+        with self._lock:
+            if self.counts.get(key, 0) > 0:
+                self.counts[key] -= 1
+
+    def empty_groups(self) -> List[Dict[str, Any]]:
+        """Resource groups that have (or, after this run's deletes, will have) no resources."""
+        with self._lock:
+            return [dict(g) for key, g in self.groups.items() if not self.counts.get(key)]
+
+
+class Snapshot:
+    """Point-in-time discovery for every type in a run, with an ID index and holder graph.
+
+    Loaded from a single query before the first wave, so every cleaner sees
+    the same moment instead of re-querying a lagging Resource Graph between
+    waves. Besides the candidates, resources of types that declare
+    `holders` are kept while in use, along with the top-level resources
+    holding them (VM holds NIC and disk, NIC or load balancer holds public
+    IP, NIC or VNet holds NSG). Deletions reported through `remove()` are
+    applied in place; a resource whose last holder is deleted becomes a
+    candidate for its type in the same run.
+    """
+
+    def __init__(self, specs: Iterable[Any], rows: List[Dict[str, Any]]):
+        arm_types = {spec.arm_type: spec.resource_type for spec in specs}
+        self.by_id: Dict[str, Dict[str, Any]] = {}
+        self.kinds: Dict[str, str] = {}  # Lowercased ID -> resource_type
+        self.candidates: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self.holders: Dict[str, Set[str]] = {}  # In-use resource -> what holds it
+        self.holding: Dict[str, Set[str]] = defaultdict(set)  # Holder -> what it holds
+        self.orphaned = 0
+        self._lock = threading.Lock()
+        for row in rows:
+            kind = row.pop("_kind")
+            held = {_top_level(h) for h in _ids(row.pop("_held", None))}
+            rid = row["id"].lower()
+            if kind:
+                self.candidates[kind].append(row)
+            elif held and row["type"].lower() in arm_types:
+                kind = arm_types[row["type"].lower()]
+                self.holders[rid] = held
+                for holder in held:
+                    self.holding[holder].add(rid)
+            else:
+                continue  # Not a candidate and nothing holds it, e.g. a reserved disk
+            self.by_id[rid] = row
+            self.kinds[rid] = kind
+
+    @classmethod
+    def load(cls, graph: ResourceGraphQuery, specs: List[Any], subscriptions: List[str],
+             conditions: Optional[Dict[str, str]] = None) -> "Snapshot":
+        snapshot = cls(specs, graph.snapshot(specs, subscriptions, conditions))
+        logging.info(f"Snapshot: {sum(map(len, snapshot.candidates.values()))} candidates, "
+                     f"{len(snapshot.holders)} in-use resources tracked")
+        return snapshot
+
+    def take(self, res_type: str) -> List[Dict[str, Any]]:
+        """Hand out the current candidates of a type; each resource is handed out once."""
+        with self._lock:
+            return self.candidates.pop(res_type, [])
+
+    def remove(self, resource: Dict[str, Any]) -> int:
+        """Apply a deletion; returns how many resources it left orphaned."""
+        rid = resource["id"].lower()
+        orphaned = 0
+        with self._lock:
+            self.by_id.pop(rid, None)
+            self.kinds.pop(rid, None)
+            for held in self.holding.pop(rid, ()):
+                holders = self.holders.get(held)
+                if holders is None:
+                    continue
+                holders.discard(rid)
+                if not holders:
+                    del self.holders[held]
+                    row = self.by_id[held]
+                    row["idleSince"] = datetime.now(timezone.utc).isoformat()  # Idle as of now, not since creation
+                    self.candidates[self.kinds[held]].append(row)
+                    orphaned += 1
+            self.orphaned += orphaned
+        return orphaned
+
+
+def _ids(values: Any) -> List[str]:
+    """Resource IDs from a `holders` array of ID strings and {"id": ...} objects."""
+    ids = []
+    for value in values or []:
+        if isinstance(value, dict):
+            value = value.get("id")
+        if value:
+            ids.append(value)
+    return ids
+
+
+def _top_level(resource_id: str) -> str:
+    """Lowercased ID of the top-level resource, e.g. the NIC of one of its IP configurations."""
+    return "/".join(resource_id.lower().split("/")[:9])
+
+
+def _key(subscription_id: str, resource_group: str) -> Tuple[str, str]:
+    return subscription_id.lower(), resource_group.lower()
@@ -17,6 +17,12 @@ def get_run_id() -> str:
     return _RUN_ID
 
 
+def set_run_id(run_id: str) -> None:
+    """Switch the correlation ID, e.g. per run in a long-lived process."""
+    global _RUN_ID
+    _RUN_ID = run_id
+
+
 class JSONFormatter(logging.Formatter):
     def format(self, record: logging.LogRecord) -> str:
         log_entry = {
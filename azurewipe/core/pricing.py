@@ -0,0 +1,100 @@
+"""Rough monthly cost estimates from a local price table.
+
+Prices are pay-as-you-go USD list prices for a typical region. They are
+only used to rank deletions and report approximate savings, never billed.
+"""
+import re
+from typing import Any, Dict
+
+HOURS_PER_MONTH = 730
+
+# Per-hour Linux prices for common VM sizes
+VM_HOURLY = {
+    "standard_b1s": 0.0104,
+    "standard_b1ms": 0.0207,
+    "standard_b2s": 0.0416,
+    "standard_b2ms": 0.0832,
+    "standard_b4ms": 0.166,
+    "standard_d2s_v3": 0.096,
+    "standard_d4s_v3": 0.192,
+    "standard_d8s_v3": 0.384,
+    "standard_d2s_v5": 0.096,
+    "standard_d4s_v5": 0.192,
+    "standard_d8s_v5": 0.384,
+    "standard_d16s_v5": 0.768,
+    "standard_e4s_v5": 0.252,
+    "standard_e8s_v5": 0.504,
+    "standard_f4s_v2": 0.169,
+    "standard_nc6s_v3": 3.06,
+}
+VM_HOURLY_PER_VCPU = 0.048  # Fallback for sizes not in the table
+VM_GPU_HOURLY_PER_VCPU = 0.5  # N-series
+
+# Per GB-month
+DISK_GB_MONTHLY = {
+    "premium_lrs": 0.15,
+    "premium_zrs": 0.225,
+    "premiumv2_lrs": 0.12,
+    "standardssd_lrs": 0.075,
+    "standardssd_zrs": 0.094,
+    "standard_lrs": 0.045,
+    "ultrassd_lrs": 0.12,
+}
+SNAPSHOT_GB_MONTHLY = 0.05
+
+PUBLIC_IP_MONTHLY = {
+    "standard": 3.65,
+    "basic": 2.63,
+}
+
+LOAD_BALANCER_MONTHLY = {
+    "standard": 18.25,  # First five rules
+    "gateway": 9.13,
+    "basic": 0.0,
+}
+
+APP_SERVICE_PLAN_MONTHLY = {
+    "b1": 13.14, "b2": 26.28, "b3": 52.56,
+    "s1": 73.0, "s2": 146.0, "s3": 292.0,
+    "p1v2": 146.0, "p2v2": 292.0, "p3v2": 584.0,
+    "p0v3": 62.05, "p1v3": 124.1, "p2v3": 248.2, "p3v3": 496.4,
+    "ep1": 153.3, "ep2": 306.6, "ep3": 613.2,
+}
+
+_VCPU_RE = re.compile(r"standard_[a-z]+?(\d+)")
+
+
+def _vm_monthly(size: str) -> float:
+    size = (size or "").lower()
+    if size in VM_HOURLY:
+        return VM_HOURLY[size] * HOURS_PER_MONTH
+    match = _VCPU_RE.match(size)
+    if not match:
+        return 0.0
+    rate = VM_GPU_HOURLY_PER_VCPU if size.startswith("standard_n") else VM_HOURLY_PER_VCPU
+    return int(match.group(1)) * rate * HOURS_PER_MONTH
+
+
+def _disk_monthly(sku: str, size_gb: Any) -> float:
+    try:
+        size = float(size_gb or 0)
+    except (TypeError, ValueError):
+        return 0.0
+    return size * DISK_GB_MONTHLY.get((sku or "").lower(), DISK_GB_MONTHLY["standard_lrs"])
+
+
+def estimate_monthly_cost(resource_type: str, resource: Dict[str, Any]) -> float:
+    """Estimate monthly cost in USD from fields projected during discovery."""
+    if resource_type == "vm":
+        return _vm_monthly(resource.get("vmSize"))
+    if resource_type == "disk":
+        return _disk_monthly(resource.get("skuName"), resource.get("diskSizeGB"))
+    if resource_type == "snapshot":
+        return float(resource.get("diskSizeGB") or 0) * SNAPSHOT_GB_MONTHLY
+    if resource_type == "publicip":
+        return PUBLIC_IP_MONTHLY.get((resource.get("skuName") or "basic").lower(), 0.0)
+    if resource_type == "lb":
+        return LOAD_BALANCER_MONTHLY.get((resource.get("skuName") or "basic").lower(), 0.0)
+    if resource_type == "appserviceplan":
+        return APP_SERVICE_PLAN_MONTHLY.get((resource.get("skuName") or "").lower(), 0.0)
+    return 0.0
@@ -0,0 +1,159 @@
+"""Opt-in profiling of a run, broken down by phase.
+
+Each phase (discovery, filter, submit, poll, report) gets one cProfile,
+written to `<run_id>.<phase>.pstats`. Only one profiler can be active
+per process, so it runs for one thread at a time: while a thread is in
+a profiled phase, phases entered concurrently by other threads count
+toward wall time and the sampler but not the pstats. A sampling thread
+records whole stacks of every thread in a phase into `<run_id>.folded`,
+which flamegraph.pl, speedscope or inferno render directly.
+"""
+import cProfile
+import io
+import logging
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+from azurewipe.core.cache import cache_dir
+
+PHASES = ("discovery", "filter", "submit", "poll", "report")
+SAMPLE_INTERVAL = 0.005  # Seconds between stack samples
+TOP_FUNCTIONS = 8  # Per phase in the summary
+
+# Profiler of the current run, if --profile is on
+PROFILER: Optional["Profiler"] = None
+
+
+def phase(name: str):
+    """Context manager attributing the enclosed work to `name` when profiling."""
+    return PROFILER.phase(name) if PROFILER is not None else nullcontext()
+
+
+class Profiler:
+    """Per-phase cProfile plus a stack sampler for flame graphs."""
+
+    def __init__(self, run_id: str, directory: Optional[Path] = None):
+        self.run_id = run_id
+        self.directory = directory or cache_dir() / "profiles"
+        self.wall: Dict[str, float] = defaultdict(float)  # Summed over threads
+        self._profiles: Dict[str, cProfile.Profile] = {}
+        self._owner: Optional[int] = None  # Thread whose phase cProfile is recording
+        self._active: Dict[int, str] = {}  # Thread ident -> phase
+        self._stacks: Counter = Counter()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, name="azurewipe-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._sampler.start()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        if getattr(self._local, "phase", None):  # Nested: keep attributing to the outer phase
+            yield
+            return
+        ident = threading.get_ident()
+        profile = None
+        with self._lock:
+            if self._owner is None:
+                self._owner = ident
+                profile = self._profiles.setdefault(name, cProfile.Profile())
+        start = time.perf_counter()
+        try:
+            self._local.phase = name
+            self._active[ident] = name
+            if profile is not None:
+                try:
+                    profile.enable()
+                except ValueError:  # Another profiler (e.g. python -m cProfile) is active
+                    profile = None
+                    with self._lock:
+                        self._owner = None
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+                with self._lock:
+                    self._owner = None
+            elapsed = time.perf_counter() - start
+            self._active.pop(ident, None)
+            self._local.phase = None
+            with self._lock:
+                self.wall[name] += elapsed
+
+    def _sample(self) -> None:
+        while not self._stop.wait(SAMPLE_INTERVAL):
+            frames = sys._current_frames()
+            for ident, name in list(self._active.items()):
+                frame = frames.get(ident)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{Path(code.co_filename).stem}:{code.co_name}")
+                    frame = frame.f_back
+                if stack:
+                    self._stacks[";".join([name, *reversed(stack)])] += 1
+
+    def finish(self) -> List[Path]:
+        """Stop sampling, write the profile files and return their paths."""
+        self._stop.set()
+        if self._sampler.is_alive():
+            self._sampler.join()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        written = []
+        folded = self.directory / f"{self.run_id}.folded"
+        folded.write_text("".join(f"{stack} {count}\n" for stack, count in sorted(self._stacks.items())))
+        written.append(folded)
+        for name, stats in self._stats().items():
+            path = self.directory / f"{self.run_id}.{name}.pstats"
+            stats.dump_stats(path)
+            written.append(path)
+        return written
+
+    def _stats(self) -> Dict[str, pstats.Stats]:
+        stats = {}
+        for name, profile in self._profiles.items():
+            try:
+                stats[name] = pstats.Stats(profile, stream=io.StringIO())
+            except TypeError:  # Never enabled: no stats collected
+                continue
+        return stats
+
+    def summary(self) -> str:
+        """Time per phase and the top functions by cumulative time in each."""
+        lines = [f"Profile {self.run_id} (phase time is summed across worker threads):"]
+        stats = self._stats()
+        for name in sorted(self.wall, key=lambda n: PHASES.index(n) if n in PHASES else len(PHASES)):
+            lines.append(f"  {name:<10} {self.wall[name]:9.3f}s")
+            if name not in stats:
+                continue
+            out = io.StringIO()
+            stats[name].stream = out
+            stats[name].sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+            rows = [row.strip() for row in out.getvalue().splitlines()
+                    if row.strip()[:1].isdigit() and "function calls" not in row]
+            lines.extend(f"      {row}" for row in rows)
+        return "\n".join(lines)
+
+
+def start_profiling(run_id: str) -> Profiler:
+    global PROFILER
+    PROFILER = Profiler(run_id)
+    PROFILER.start()
+    return PROFILER
+
+
+def stop_profiling() -> None:
+    global PROFILER
+    profiler, PROFILER = PROFILER, None
+    if profiler is None:
+        return
+    paths = profiler.finish()
+    logging.warning(profiler.summary())
+    logging.warning(f"Profile written to {paths[0].parent} ({paths[0].name} for flame graphs)")
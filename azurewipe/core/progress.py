@@ -0,0 +1,128 @@
+"""Progress events published by the cleanup engine.
+
+The engine records state transitions here; consumers (the TUI) poll
+`snapshot()` and `events_since()` on their own schedule, so publishing
+never blocks on rendering. Only the latest EVENT_BUFFER events are kept;
+a consumer that falls further behind skips the oldest.
+"""
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from itertools import islice
+from typing import Deque, Dict, List, Optional, Tuple
+
+STATES = ("discovered", "queued", "in_flight", "done", "failed", "skipped", "deferred")
+EVENT_BUFFER = 50_000
+
+
+@dataclass
+class ProgressEvent:
+    resource_id: str
+    resource_type: str
+    subscription: str
+    status: str
+    timestamp: float
+    error: str = ""
+
+
+@dataclass
+class ProgressSnapshot:
+    # Current state counts per (type, subscription); "discovered" is cumulative
+    counts: Dict[Tuple[str, str], Dict[str, int]]
+    totals: Dict[str, int]
+    discovered: int
+    throttled: int
+    elapsed: float
+    throughput: float  # Completed deletes per second
+    eta: Optional[float]  # Seconds until the queue drains, if known
+    phase: str = ""
+    finished: bool = False
+
+
+class ProgressTracker:
+    """Thread-safe counters and a bounded event log for one run."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.phase = ""
+        self.finished = False
+        self._lock = threading.Lock()
+        self._state: Dict[str, str] = {}
+        self._counts: Dict[Tuple[str, str], Counter] = {}
+        self._discovered_by: Counter = Counter()  # (type, subscription) -> resources ever seen
+        self._discovered = 0
+        self._throttled = 0
+        self._first_delete: Optional[float] = None
+        self._events: Deque[ProgressEvent] = deque(maxlen=EVENT_BUFFER)
+        self._evicted = 0  # Absolute index of the oldest buffered event
+
+    def record(self, resource: Dict, resource_type: str, status: str, error: str = "") -> None:
+        """Move a resource to `status` and append the transition to the log."""
+        res_id = resource["id"]
+        sub = resource.get("subscriptionId", "")
+        now = time.time()
+        with self._lock:
+            counts = self._counts.setdefault((resource_type, sub), Counter())
+            previous = self._state.get(res_id)
+            if previous:
+                counts[previous] -= 1
+            else:
+                self._discovered += 1
+                self._discovered_by[(resource_type, sub)] += 1
+            counts[status] += 1
+            self._state[res_id] = status
+            if status == "in_flight" and self._first_delete is None:
+                self._first_delete = now
+            if len(self._events) == EVENT_BUFFER:
+                self._evicted += 1
+            self._events.append(ProgressEvent(res_id, resource_type, sub, status, now, error))
+
+    def record_throttle(self, status_code: int = 429) -> None:
+        with self._lock:
+            self._throttled += 1
+
+    def set_phase(self, phase: str) -> None:
+        self.phase = phase
+
+    def finish(self) -> None:
+        self.phase = "finished"
+        self.finished = True
+
+    def events_since(self, cursor: int) -> Tuple[List[ProgressEvent], int]:
+        """Return events appended after `cursor` and the new cursor.
+
+        Cursors count every event ever recorded, so they stay valid as old
+        events are dropped from the buffer.
+        """
+        with self._lock:
+            events = list(islice(self._events, max(cursor - self._evicted, 0), None))
+            end = self._evicted + len(self._events)
+        return events, end
+
+    def snapshot(self) -> ProgressSnapshot:
+        with self._lock:
+            counts = {key: {**c, "discovered": self._discovered_by[key]} for key, c in self._counts.items()}
+            discovered = self._discovered
+            throttled = self._throttled
+            first_delete = self._first_delete
+        totals: Counter = Counter()
+        for c in counts.values():
+            totals.update(c)
+        totals["discovered"] = discovered
+        now = time.time()
+        completed = totals["done"] + totals["failed"]
+        throughput = completed / (now - first_delete) if first_delete and now > first_delete else 0.0
+        pending = totals["queued"] + totals["in_flight"]
+        eta = pending / throughput if throughput else None
+        return ProgressSnapshot(
+            counts=counts,
+            totals=dict(totals),
+            discovered=discovered,
+            throttled=throttled,
+            elapsed=now - self.started,
+            throughput=throughput,
+            eta=eta,
+            phase=self.phase,
+            finished=self.finished,
+        )
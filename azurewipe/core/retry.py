@@ -1,41 +1,135 @@
 """Retry utilities with exponential backoff."""
+import json
+import threading
 import time
-import random
 import logging
-from functools import wraps
-from typing import Callable, TypeVar, Any
-from azure.core.exceptions import HttpResponseError, ServiceRequestError
-
-T = TypeVar("T")
-
-
-def retry_with_backoff(
-    max_attempts: int = 5,
-    base_delay: float = 1.0,
-    max_delay: float = 60.0,
-    retryable_codes: tuple = (429, 503, 504),
-):
-    """Decorator for retrying Azure operations with exponential backoff."""
-    def decorator(func: Callable[..., T]) -> Callable[..., T]:
-        @wraps(func)
-        def wrapper(*args, **kwargs) -> T:
-            for attempt in range(max_attempts):
-                try:
-                    return func(*args, **kwargs)
-                except HttpResponseError as e:
-                    if e.status_code not in retryable_codes:
-                        raise
-                    if attempt == max_attempts - 1:
-                        raise
-                    delay = min(base_delay * (2 ** attempt) + random.uniform(0, 1), max_delay)
-                    logging.warning(f"{func.__name__} got {e.status_code}, retrying in {delay:.1f}s")
-                    time.sleep(delay)
-                except ServiceRequestError as e:
-                    if attempt == max_attempts - 1:
-                        raise
-                    delay = min(base_delay * (2 ** attempt), max_delay)
-                    logging.warning(f"{func.__name__} connection error, retrying in {delay:.1f}s")
-                    time.sleep(delay)
-            return func(*args, **kwargs)
-        return wrapper
-    return decorator
+from typing import Any, Callable, Dict, List
+from azure.core.pipeline.policies import RetryPolicy
+
+# Per credential (so per tenant): called with the status code whenever a
+# throttled request made with that credential is retried
+_THROTTLE_LISTENERS: Dict[Any, List[Callable[[int], None]]] = {}
+_LISTENER_LOCK = threading.Lock()
+
+
+def add_throttle_listener(credential: Any, listener: Callable[[int], None]) -> None:
+    with _LISTENER_LOCK:
+        _THROTTLE_LISTENERS.setdefault(credential, []).append(listener)
+
+
+def remove_throttle_listener(credential: Any, listener: Callable[[int], None]) -> None:
+    with _LISTENER_LOCK:
+        listeners = _THROTTLE_LISTENERS.get(credential, [])
+        if listener in listeners:
+            listeners.remove(listener)
+        if not listeners:
+            _THROTTLE_LISTENERS.pop(credential, None)
+
+
+def _notify_throttle(credential: Any, status_code: int) -> None:
+    with _LISTENER_LOCK:
+        listeners = list(_THROTTLE_LISTENERS.get(credential, ()))
+    for listener in listeners:
+        listener(status_code)
+
+
+class RetryBudget:
+    """Token bucket capping retries at a fraction of successful requests.
+
+    Shared by every client and worker, so a throttled tenant sees a bounded
+    amount of extra traffic instead of every worker retrying independently.
+    A small per-second floor keeps retries possible after a quiet period.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_per_second: float = 2.0, max_tokens: float = 50.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, amount: float) -> None:
+        now = time.monotonic()
+        amount += (now - self._updated) * self.min_per_second
+        self._updated = now
+        self._tokens = min(self.max_tokens, self._tokens + amount)
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._refill(self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            self._refill(0.0)
+            if self._tokens < 1.0:
+                return False
+            self._tokens -= 1.0
+            return True
+
+
+SHARED_BUDGET = RetryBudget()
+
+# Per-operation keyword (time.monotonic() value) after which no request is
+# retried; BudgetedRetryPolicy consumes it before it reaches the transport
+DEADLINE_OPTION = "azurewipe_deadline"
+
+# DELETE conflicts that clear up on their own once a concurrent operation ends
+RETRYABLE_DELETE_CONFLICTS = ("AnotherOperationInProgress", "RetryableError")
+
+
+class BudgetedRetryPolicy(RetryPolicy):
+    """azure-core RetryPolicy that retries single HTTP calls within a shared budget.
+
+    Because it sits in the client pipeline, a throttled LRO poll retries
+    just that GET instead of restarting the whole delete. DELETE requests
+    are also retried on transient 409 conflicts. With DEADLINE_OPTION, the
+    request's retries stop at that deadline, and a retry whose Retry-After
+    would outlast it is not attempted.
+    """
+
+    def __init__(self, budget: RetryBudget = SHARED_BUDGET, credential: Any = None, **kwargs):
+        super().__init__(**kwargs)
+        self.budget = budget
+        self.credential = credential  # Whose throttle listeners hear about retries
+
+    def is_retry(self, settings, response) -> bool:
+        status = response.http_response.status_code
+        if status == 409 and response.http_request.method == "DELETE" and settings["total"]:
+            try:
+                response.http_response.read()  # Initial LRO requests are streamed
+                code = json.loads(response.http_response.text()).get("error", {}).get("code", "")
+            except (ValueError, AttributeError):
+                code = ""
+            return code in RETRYABLE_DELETE_CONFLICTS
+        return super().is_retry(settings, response)
+
+    def configure_retries(self, options):
+        deadline = options.pop(DEADLINE_OPTION, None)
+        settings = super().configure_retries(options)
+        now = time.monotonic()
+        if deadline is not None:
+            settings["timeout"] = max(0.0, min(settings["timeout"], deadline - now))
+        settings["deadline"] = now + settings["timeout"]
+        return settings
+
+    def increment(self, settings, response=None, error=None) -> bool:
+        if not super().increment(settings, response=response, error=error):
+            return False
+        # On connection errors azure-core passes the PipelineRequest as `response`
+        http_response = getattr(response, "http_response", None)
+        retry_after = self.get_retry_after(response) if http_response is not None else None
+        if retry_after and time.monotonic() + retry_after > settings["deadline"]:
+            logging.warning(f"Retry-After {retry_after:.0f}s is past the deadline, not retrying")
+            return False
+        if not self.budget.withdraw():
+            logging.warning("Retry budget exhausted, not retrying")
+            return False
+        status = http_response.status_code if http_response is not None else None
+        if status in (429, 503):
+            _notify_throttle(self.credential, status)
+        return True
+
+    def update_context(self, context, retry_settings) -> None:
+        super().update_context(context, retry_settings)
+        self.budget.deposit()
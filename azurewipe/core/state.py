@@ -0,0 +1,82 @@
+"""State of a live run cut short by its budget, so a later run can continue it."""
+import json
+import logging
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+from azurewipe.core.cache import cache_dir
+from azurewipe.core.config import Config
+
+STATE_FILE = "run-state.json"
+PENDING_ID_LIMIT = 500  # Above this many IDs a pending type is rediscovered in full
+
+
+def _state_path(tenant_id: str = "") -> Path:
+    """One state file per tenant, so tenants cleaned concurrently don't overwrite each other."""
+    return cache_dir() / (f"run-state-{tenant_id}.json" if tenant_id else STATE_FILE)
+
+
+@dataclass
+class RunState:
+    run_id: str
+    resource_types: List[str]  # Types the run set out to clean, in order
+    completed: List[str] = field(default_factory=list)  # Types with nothing deferred or failed
+    pending: Dict[str, List[str]] = field(default_factory=dict)  # Deferred and failed resource IDs per type
+    saved_at: float = field(default_factory=time.time)
+    tenant_id: str = ""  # Empty for the login tenant
+
+    @property
+    def remaining_types(self) -> List[str]:
+        return [t for t in self.resource_types if t not in self.completed]
+
+    def pending_ids(self, res_type: str) -> Optional[Set[str]]:
+        """Lowercased IDs left over for a type, or None when it must be rediscovered in full."""
+        if res_type not in self.pending:
+            return None
+        return {i.lower() for i in self.pending[res_type]}
+
+    def pending_kql(self, res_type: str) -> Optional[str]:
+        """KQL condition limiting discovery of a type to its pending IDs, if short enough."""
+        ids = self.pending.get(res_type)
+        if not ids or len(ids) > PENDING_ID_LIMIT:
+            return None
+        return f"id in~ ({', '.join(json.dumps(i) for i in ids)})"
+
+    def save(self) -> None:
+        path = _state_path(self.tenant_id)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(asdict(self), indent=2))
+        tmp.replace(path)
+        logging.info(f"Saved run state to {path}")
+
+    @classmethod
+    def load(cls, tenant_id: str = "") -> Optional["RunState"]:
+        try:
+            return cls(**json.loads(_state_path(tenant_id).read_text()))
+        except FileNotFoundError:
+            return None
+        except (ValueError, TypeError) as e:
+            logging.warning(f"Ignoring unreadable run state: {e}")
+            return None
+
+    @staticmethod
+    def clear(tenant_id: str = "") -> None:
+        _state_path(tenant_id).unlink(missing_ok=True)
+
+
+def resume(config: Config, tenant_id: str = "") -> Optional[RunState]:
+    """Limit `config` to the types the last interrupted run left over, if there was one.
+
+    The returned state goes to the cleaner, which then only looks at the
+    pending resources of types the previous run started.
+    """
+    state = RunState.load(tenant_id)
+    if state is None:
+        logging.warning("No interrupted run to resume; starting a full run")
+        return None
+    pending = sum(len(ids) for ids in state.pending.values())
+    logging.info(f"Resuming run {state.run_id}: {', '.join(state.remaining_types)} "
+                 f"({pending} deferred or failed)")
+    config.resource_types = state.remaining_types
+    return state
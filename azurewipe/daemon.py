@@ -0,0 +1,353 @@
+"""Long-running `azurewipe serve` mode: warm engine, scheduled runs and a local HTTP API.
+
+The credential, SDK clients and subscription list live for the whole
+process, so a scheduled run starts straight at discovery. Runs execute one
+at a time through the same AzureResourceCleaner and Config as the CLI.
+The resource-group inventory is reloaded at the start of every run, since
+a stale one could report a group as empty after something new landed in it.
+
+API (JSON). Everything but /health needs `Authorization: Bearer <token>`,
+with the token read from TOKEN_FILE in the cache directory (owner-only),
+which is rewritten each time the daemon starts:
+    GET  /health      daemon status
+    GET  /runs        recent runs
+    POST /runs        queue a run; body may narrow RUN_OVERRIDES
+    GET  /runs/<id>   one run, with live progress and its report
+"""
+import fnmatch
+import hmac
+import json
+import logging
+import os
+import queue
+import secrets
+import socketserver
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from azurewipe.cleaner import AzureResourceCleaner
+from azurewipe.core.auth import get_credential
+from azurewipe.core.cache import cache_dir
+from azurewipe.core.config import Config
+from azurewipe.core.graph import ResourceGraphQuery
+from azurewipe.core.logging import set_run_id
+from azurewipe.core.progress import ProgressTracker
+from azurewipe.resources import CLEANERS
+
+# Config fields a POST /runs body may change for that run
+RUN_OVERRIDES = ("dry_run", "subscriptions", "resource_groups", "resource_types", "time_budget", "max_deletes")
+MAX_HISTORY = 50  # Finished runs kept for GET /runs
+TOKEN_FILE = "daemon.token"
+MAX_BODY = 64 * 1024  # Bytes; a POST /runs body is a handful of fields
+
+
+class ScopeError(ValueError):
+    """An override that would make a run reach further than the daemon's config."""
+
+
+def _write_token() -> str:
+    token = secrets.token_urlsafe(32)
+    fd = os.open(cache_dir() / TOKEN_FILE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        f.write(token)
+    return token
+
+
+def _string_list(key: str, value: Any) -> List[str]:
+    if not isinstance(value, list) or not value or not all(isinstance(v, str) and v for v in value):
+        raise ValueError(f"{key} must be a non-empty list of strings")
+    return value
+
+
+def _has_glob(pattern: str) -> bool:
+    return any(c in pattern for c in "*?[")
+
+
+def validate_overrides(config: Config, overrides: Dict[str, Any]) -> Dict[str, Any]:
+    """Type-check a POST /runs body and make sure it only narrows `config`.
+
+    Raises ValueError for malformed values and ScopeError for anything that
+    would widen the configured scope, raise a cap or go live.
+    """
+    unknown = set(overrides) - set(RUN_OVERRIDES)
+    if unknown:
+        raise ValueError(f"cannot override: {', '.join(sorted(unknown))}")
+    if "dry_run" in overrides:
+        if not isinstance(overrides["dry_run"], bool):
+            raise ValueError("dry_run must be true or false")
+        if config.dry_run and not overrides["dry_run"]:
+            raise ScopeError("daemon was started in dry-run mode")
+    if "subscriptions" in overrides:
+        subs = _string_list("subscriptions", overrides["subscriptions"])
+        if "all" not in config.subscriptions:
+            allowed = {s.lower() for s in config.subscriptions}
+            outside = [s for s in subs if s.lower() not in allowed]
+            if outside:
+                raise ScopeError(f"subscriptions outside the daemon's scope: {', '.join(outside)}")
+    if "resource_groups" in overrides:
+        groups = _string_list("resource_groups", overrides["resource_groups"])
+        if "all" not in config.resource_groups:
+            # A concrete name must fall under a configured pattern; a pattern
+            # must be one of the configured ones, since glob containment is undecidable here
+            outside = [g for g in groups if g not in config.resource_groups
+                       and (_has_glob(g) or not any(fnmatch.fnmatch(g, p) for p in config.resource_groups))]
+            if outside:
+                raise ScopeError(f"resource groups outside the daemon's scope: {', '.join(outside)}")
+    if "resource_types" in overrides:
+        types = _string_list("resource_types", overrides["resource_types"])
+        if "all" in config.resource_types:
+            allowed = {t for t, c in CLEANERS.items() if not c.opt_in} | {"all"}
+        else:
+            allowed = set(config.resource_types)
+        outside = [t for t in types if t not in allowed]
+        if outside:
+            raise ScopeError(f"resource types outside the daemon's scope: {', '.join(outside)}")
+    for key, kind in (("time_budget", (int, float)), ("max_deletes", int)):
+        if key not in overrides:
+            continue
+        value = overrides[key]
+        if isinstance(value, bool) or not isinstance(value, kind) or value <= 0:
+            raise ValueError(f"{key} must be a positive number")
+        limit = getattr(config, key)
+        if limit is not None and value > limit:
+            raise ScopeError(f"{key} may not exceed the daemon's {limit}")
+    return overrides
+
+
+@dataclass
+class Run:
+    id: str
+    trigger: str  # "schedule" or "api"
+    config: Config
+    status: str = "queued"  # queued, running, done, failed
+    queued_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: str = ""
+    progress: ProgressTracker = field(default_factory=ProgressTracker)
+    report: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self, detail: bool = False) -> Dict[str, Any]:
+        data = {
+            "id": self.id,
+            "trigger": self.trigger,
+            "status": self.status,
+            "dry_run": self.config.dry_run,
+            "queued_at": self.queued_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+        }
+        if detail:
+            snap = self.progress.snapshot()
+            data["progress"] = {
+                "phase": snap.phase,
+                "totals": snap.totals,
+                "throughput": snap.throughput,
+                "eta": snap.eta,
+            }
+            data["report"] = self.report
+        return data
+
+
+class Daemon:
+    """Runs cleanup on a schedule and on request, reusing warm state between runs."""
+
+    def __init__(self, config: Config, interval: Optional[float] = 3600.0):
+        self.config = config
+        self.interval = interval or None  # 0 disables the schedule
+        if config.tenants:
+            logging.warning("serve cleans the login tenant only; run one daemon per tenant")
+        self.credential = get_credential(persist=config.token_cache)
+        self.graph = ResourceGraphQuery(self.credential, config.management_groups)
+        self.token: Optional[str] = None  # Set by serve()
+        self.runs: "OrderedDict[str, Run]" = OrderedDict()
+        self.next_run_at: Optional[float] = None
+        self._queue: "queue.Queue[Run]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def warm(self) -> None:
+        """Acquire a token and list subscriptions before the first run."""
+        if hasattr(self.credential, "warm"):
+            self.credential.warm()
+        self.graph.list_subscription_details()
+
+    def submit(self, trigger: str = "api", **overrides) -> Run:
+        run = Run(str(uuid.uuid4())[:8], trigger, replace(self.config, **overrides))
+        with self._lock:
+            self.runs[run.id] = run
+            finished = [r.id for r in self.runs.values() if r.finished_at]
+            for run_id in finished[:max(0, len(finished) - MAX_HISTORY)]:
+                del self.runs[run_id]
+        self._queue.put(run)
+        logging.info(f"Queued run {run.id} ({trigger})")
+        return run
+
+    def get(self, run_id: str) -> Optional[Run]:
+        with self._lock:
+            return self.runs.get(run_id)
+
+    def list_runs(self) -> List[Run]:
+        with self._lock:
+            return list(self.runs.values())
+
+    def _busy(self) -> bool:
+        return any(r.status in ("queued", "running") for r in self.list_runs())
+
+    def _worker(self) -> None:
+        while not self._stop.is_set():
+            try:
+                run = self._queue.get(timeout=1)
+            except queue.Empty:
+                continue
+            self._execute(run)
+
+    def _execute(self, run: Run) -> None:
+        set_run_id(run.id)
+        run.status = "running"
+        run.started_at = time.time()
+        cleaner = None
+        try:
+            if "all" in run.config.subscriptions:
+                self.graph.list_subscription_details(refresh=True)  # Pick up new subscriptions
+            cleaner = AzureResourceCleaner(run.config, self.credential, run.progress)
+            cleaner.purge(show_report=False)
+            run.status = "done"
+        except Exception as e:
+            logging.exception(f"Run {run.id} failed")
+            run.status = "failed"
+            run.error = str(e)
+        finally:
+            if cleaner is not None:
+                run.report = cleaner.report
+            run.finished_at = time.time()
+
+    def _schedule(self) -> None:
+        while True:
+            self.next_run_at = time.time() + self.interval
+            if self._stop.wait(self.interval):
+                return
+            if self._busy():
+                logging.warning("Previous run still pending, skipping scheduled run")
+                continue
+            self.submit("schedule")
+
+    def serve(self, listen: str = "127.0.0.1:8765", socket_path: Optional[str] = None) -> None:
+        """Warm up, start the worker and schedule, and serve the API until interrupted."""
+        self.warm()
+        self.token = _write_token()
+        server = _make_server(self, listen, socket_path)
+        threading.Thread(target=self._worker, name="azurewipe-worker", daemon=True).start()
+        if self.interval:
+            self.submit("schedule")
+            threading.Thread(target=self._schedule, name="azurewipe-schedule", daemon=True).start()
+        schedule = f"every {self.interval:g}s" if self.interval else "API only"
+        logging.warning(f"azurewipe serving on {socket_path or listen} ({schedule}, dry_run={self.config.dry_run}); "
+                        f"API token in {cache_dir() / TOKEN_FILE}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            logging.info("Shutting down")
+        finally:
+            self._stop.set()
+            server.server_close()
+            if socket_path:
+                os.unlink(socket_path)
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def _make_server(daemon: Daemon, listen: str, socket_path: Optional[str]) -> socketserver.BaseServer:
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = _UnixHTTPServer(socket_path, _Handler)
+        os.chmod(socket_path, 0o600)
+    else:
+        host, _, port = listen.rpartition(":")
+        server = ThreadingHTTPServer((host or "127.0.0.1", int(port)), _Handler)
+    server.app = daemon
+    return server
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def _authorized(self) -> bool:
+        """Check the bearer token; answers 401 itself when it is missing or wrong."""
+        token = self.server.app.token
+        given = self.headers.get("Authorization", "")
+        if token and hmac.compare_digest(given.encode(), f"Bearer {token}".encode()):
+            return True
+        self._send(401, {"error": "missing or invalid token"})
+        return False
+
+    def do_GET(self):
+        daemon: Daemon = self.server.app
+        if self.path != "/health" and not self._authorized():
+            return
+        if self.path == "/health":
+            runs = daemon.list_runs()
+            self._send(200, {
+                "status": "ok",
+                "dry_run": daemon.config.dry_run,
+                "queued": sum(r.status == "queued" for r in runs),
+                "running": next((r.id for r in runs if r.status == "running"), None),
+                "next_run_at": daemon.next_run_at,
+            })
+        elif self.path == "/runs":
+            self._send(200, [r.to_dict() for r in reversed(daemon.list_runs())])
+        elif self.path.startswith("/runs/"):
+            run = daemon.get(self.path[len("/runs/"):])
+            if run is None:
+                self._send(404, {"error": "unknown run"})
+            else:
+                self._send(200, run.to_dict(detail=True))
+        else:
+            self._send(404, {"error": "not found"})
+
+    def do_POST(self):
+        daemon: Daemon = self.server.app
+        if not self._authorized():
+            return
+        if self.path != "/runs":
+            self._send(404, {"error": "not found"})
+            return
+        # Browsers can't send application/json cross-origin without a preflight
+        if self.headers.get_content_type() != "application/json":
+            self._send(415, {"error": "Content-Type must be application/json"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            if not 0 <= length <= MAX_BODY:
+                raise ValueError(f"Content-Length must be between 0 and {MAX_BODY}")
+            overrides = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(overrides, dict):
+                raise ValueError("body must be a JSON object")
+            validate_overrides(daemon.config, overrides)
+        except ScopeError as e:
+            self._send(403, {"error": str(e)})
+            return
+        except ValueError as e:
+            self._send(400, {"error": f"invalid body: {e}"})
+            return
+        run = daemon.submit("api", **overrides)
+        self._send(202, run.to_dict(), location=f"/runs/{run.id}")
+
+    def _send(self, status: int, payload: Any, location: Optional[str] = None) -> None:
+        body = json.dumps(payload, default=str).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if location:
+            self.send_header("Location", location)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.debug(f"http: {format % args}")
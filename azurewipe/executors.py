@@ -0,0 +1,125 @@
+"""Execution backends for the delete loop of a wave.
+
+Every backend runs the orchestrator's per-resource step, so budget,
+reporting and inventory updates stay in this process. They differ in how
+steps overlap and where the SDK delete itself runs:
+
+- serial: one at a time, in cost order
+- threads: a thread pool; SDK clients are shared and thread-safe
+- processes: the delete and its polling run in worker processes, each
+  with its own credential and clients; results come back as DeleteResult
+- asyncio: an event loop bounding concurrency with a semaphore. The SDK
+  calls are synchronous, so each step runs via asyncio.to_thread.
+"""
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from azurewipe.core.auth import get_credential
+from azurewipe.core.config import Config
+from azurewipe.core.profiling import phase
+from azurewipe.core.logging import get_run_id, set_run_id, setup_logging
+from azurewipe.resources import CLEANERS
+from azurewipe.resources.base import DeleteResult, ResourceCleaner
+from azurewipe.scheduler import RunBudget
+
+EXECUTORS = ("serial", "threads", "processes", "asyncio")
+
+Step = Callable[[ResourceCleaner, Dict[str, Any], Optional[Callable]], None]
+
+
+class SerialExecutor:
+    def __init__(self, workers: int = 1):
+        self.workers = max(1, workers)
+
+    def delete_fn(self, cleaner: ResourceCleaner) -> Optional[Callable[[Dict[str, Any]], DeleteResult]]:
+        """How `cleaner` should delete a resource; None means in this process."""
+        return None
+
+    def run(self, step: Step, tasks: List[Tuple[ResourceCleaner, Dict[str, Any]]]) -> None:
+        for cleaner, res in tasks:
+            step(cleaner, res, self.delete_fn(cleaner))
+
+    def close(self) -> None:
+        pass
+
+
+class ThreadExecutor(SerialExecutor):
+    def run(self, step: Step, tasks: List[Tuple[ResourceCleaner, Dict[str, Any]]]) -> None:
+        # Tasks are submitted in cost order, so the expensive ones still start first
+        with ThreadPoolExecutor(self.workers, thread_name_prefix="azurewipe-delete") as pool:
+            futures = [pool.submit(step, cleaner, res, self.delete_fn(cleaner)) for cleaner, res in tasks]
+            for future in futures:
+                future.result()
+
+
+# Cleaners built inside a worker process, reused across its tasks
+_WORKER_CLEANERS: Dict[Tuple[str, str, Optional[str]], ResourceCleaner] = {}
+
+
+def _delete_in_worker(resource_type: str, config: Config, budget: Optional[RunBudget],
+                      tenant_id: Optional[str], resource: Dict[str, Any]) -> DeleteResult:
+    key = (resource_type, config.name, tenant_id)
+    cleaner = _WORKER_CLEANERS.get(key)
+    if cleaner is None:
+        credential = get_credential(persist=config.token_cache, tenant_id=tenant_id)
+        cleaner = CLEANERS[resource_type](credential, config)
+        _WORKER_CLEANERS[key] = cleaner
+    cleaner.budget = budget  # Fresh copy carries the run deadline
+    return cleaner.delete(resource)
+
+
+def _init_worker(verbosity: int, json_logs: bool, run_id: str) -> None:
+    setup_logging(verbosity, json_logs)
+    set_run_id(run_id)
+
+
+class ProcessExecutor(ThreadExecutor):
+    """Parent threads do the bookkeeping and block on deletes running in worker processes."""
+
+    def __init__(self, workers: int = 1, config: Optional[Config] = None):
+        super().__init__(workers)
+        config = config or Config()
+        # spawn: forking a process that already runs credential refresh
+        # and HTTP threads can inherit held locks
+        self.pool = ProcessPoolExecutor(
+            self.workers, mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker, initargs=(config.verbosity, config.json_logs, get_run_id()),
+        )
+
+    def delete_fn(self, cleaner: ResourceCleaner) -> Callable[[Dict[str, Any]], DeleteResult]:
+        def delete(resource: Dict[str, Any]) -> DeleteResult:
+            future = self.pool.submit(_delete_in_worker, cleaner.resource_type, cleaner.config, cleaner.budget,
+                                      getattr(cleaner.credential, "tenant_id", None), resource)
+            with phase("poll"):  # The worker's own time is not profiled
+                return future.result()
+        return delete
+
+    def close(self) -> None:
+        self.pool.shutdown()
+
+
+class AsyncioExecutor(SerialExecutor):
+    def run(self, step: Step, tasks: List[Tuple[ResourceCleaner, Dict[str, Any]]]) -> None:
+        asyncio.run(self._run(step, tasks))
+
+    async def _run(self, step: Step, tasks: List[Tuple[ResourceCleaner, Dict[str, Any]]]) -> None:
+        limit = asyncio.Semaphore(self.workers)
+
+        async def bounded(cleaner: ResourceCleaner, res: Dict[str, Any]) -> None:
+            async with limit:
+                await asyncio.to_thread(step, cleaner, res, self.delete_fn(cleaner))
+
+        await asyncio.gather(*(bounded(cleaner, res) for cleaner, res in tasks))
+
+
+def make_executor(config: Config) -> SerialExecutor:
+    if config.executor == "serial":
+        return SerialExecutor()
+    if config.executor == "threads":
+        return ThreadExecutor(config.workers)
+    if config.executor == "processes":
+        return ProcessExecutor(config.workers, config)
+    if config.executor == "asyncio":
+        return AsyncioExecutor(config.workers)
+    raise ValueError(f"Unknown executor: {config.executor} (choose from {', '.join(EXECUTORS)})")
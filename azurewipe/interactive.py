@@ -1,17 +1,29 @@
 """Interactive TUI for AzureWipe using Textual."""
+from dataclasses import dataclass
+from typing import List, Optional
+
+from rich.segment import Segment
+from rich.style import Style
 from textual.app import App, ComposeResult
-from textual.containers import Container, Horizontal
-from textual.widgets import Header, Footer, Button, Static, SelectionList, Input
+from textual.containers import Container, Horizontal, Vertical
+from textual.geometry import Size
+from textual.message import Message
+from textual.reactive import reactive
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
+from textual.widgets import Header, Footer, Button, Static, SelectionList, Input, DataTable
 from textual.widgets.selection_list import Selection
 from textual.screen import Screen
 from textual.binding import Binding
 from textual import on, work
 
 from azurewipe.core.config import Config
+from azurewipe.core.progress import ProgressTracker
 from azurewipe.core.logging import setup_logging, get_run_id
 from azurewipe.core.auth import get_credential
 from azurewipe.core.graph import ResourceGraphQuery
 from azurewipe.cleaner import AzureResourceCleaner
+from azurewipe.resources import CLEANERS
 
 
 class ConfirmScreen(Screen):
@@ -51,36 +63,156 @@ class ConfirmScreen(Screen):
         self.app.pop_screen()
 
 
+def fuzzy_score(query: str, text: str) -> Optional[int]:
+    """Score `query` as a subsequence of `text`; None if it doesn't match.
+
+    Lower is better: contiguous runs and early matches score lowest.
+    """
+    if not query:
+        return 0
+    text = text.lower()
+    pos = text.find(query)
+    if pos >= 0:
+        return pos
+    score, last = 0, -1
+    for ch in query:
+        idx = text.find(ch, last + 1)
+        if idx < 0:
+            return None
+        score += (idx - last - 1) * 2 + 1
+        last = idx
+    return 1000 + score
+
+
 class SubscriptionSelectScreen(Screen):
+    """Multi-select subscription picker for tenants with thousands of subscriptions.
+
+    Subscriptions load in a worker thread; only the best `MAX_VISIBLE`
+    fuzzy matches are shown, and their resource counts are fetched lazily.
+    """
+
     BINDINGS = [("escape", "cancel", "Cancel")]
+    MAX_VISIBLE = 200
 
-    def __init__(self, subscriptions: list[str], callback):
+    def __init__(self, graph: ResourceGraphQuery, callback):
         super().__init__()
-        self.subscriptions = subscriptions
+        self.graph = graph
         self.callback = callback
+        self.subscriptions: List[dict] = []
+        self.selected: set = set()
+        self.counts: dict = {}
+        self.pending_counts: set = set()
+        self.shown_ids: List[str] = []
 
     def compose(self) -> ComposeResult:
         with Container(id="select-dialog"):
-            yield Static("Select subscription:", id="select-title")
-            yield SelectionList[str](
-                *[Selection(s[:36], s, False) for s in self.subscriptions],
-                id="sub-list"
-            )
+            yield Static("Select subscriptions:", id="select-title")
+            yield Input(placeholder="Search by name or ID", id="sub-search")
+            yield SelectionList[str](id="sub-list")
+            yield Static("Loading subscriptions...", id="sub-status")
             with Horizontal(id="select-buttons"):
                 yield Button("Cancel", id="cancel")
                 yield Button("Select", variant="primary", id="select")
 
+    def on_mount(self) -> None:
+        self.load_subscriptions()
+
+    @work(thread=True, exclusive=True, group="subscriptions")
+    def load_subscriptions(self) -> None:
+        try:
+            subs = self.graph.list_subscription_details()
+        except Exception as e:
+            self.app.call_from_thread(self.set_status, f"Failed to list subscriptions: {e}")
+            return
+        subs.sort(key=lambda s: (s["state"] != "Enabled", s["display_name"].lower()))
+        self.app.call_from_thread(self._loaded, subs)
+
+    def _loaded(self, subs: List[dict]) -> None:
+        self.subscriptions = subs
+        self.refresh_list()
+
+    def set_status(self, msg: str) -> None:
+        self.query_one("#sub-status", Static).update(msg)
+
+    def _label(self, sub: dict) -> str:
+        sub_id = sub["subscription_id"]
+        label = f"{sub['display_name'][:32]}  ({sub_id[:8]})"
+        if sub["state"] != "Enabled":
+            label += f" [{sub['state']}]"
+        if sub_id in self.counts:
+            label += f"  · {self.counts[sub_id]} resources"
+        return label
+
+    def refresh_list(self) -> None:
+        query = self.query_one("#sub-search", Input).value.strip().lower()
+        scored = []
+        for sub in self.subscriptions:
+            score = fuzzy_score(query, f"{sub['display_name']} {sub['subscription_id']}")
+            if score is not None:
+                scored.append((score, sub))
+        scored.sort(key=lambda item: item[0])
+        shown = [sub for _, sub in scored[:self.MAX_VISIBLE]]
+        self.shown_ids = [sub["subscription_id"] for sub in shown]
+
+        sub_list = self.query_one("#sub-list", SelectionList)
+        highlighted = sub_list.highlighted
+        with self.app.batch_update():
+            sub_list.clear_options()
+            # Only enabled subscriptions can be cleaned (or queried for counts)
+            sub_list.add_options([
+                Selection(self._label(sub), sub["subscription_id"], sub["subscription_id"] in self.selected,
+                          disabled=sub["state"] != "Enabled")
+                for sub in shown
+            ])
+            if highlighted is not None and shown:
+                sub_list.highlighted = min(highlighted, len(shown) - 1)
+        status = f"{len(scored)} of {len(self.subscriptions)} match, {len(self.selected)} selected"
+        if len(scored) > len(shown):
+            status += f" (showing first {len(shown)}, type to narrow)"
+        self.set_status(status)
+        missing = [sub["subscription_id"] for sub in shown if sub["state"] == "Enabled"
+                   and sub["subscription_id"] not in self.counts and sub["subscription_id"] not in self.pending_counts]
+        if missing:
+            # Counts state is only touched on the UI thread
+            self.pending_counts.update(missing)
+            self.load_counts(missing)
+
+    @work(thread=True, group="counts")
+    def load_counts(self, sub_ids: List[str]) -> None:
+        try:
+            counts = self.graph.count_resources(sub_ids)
+        except Exception:
+            counts = {}
+        self.app.call_from_thread(self._counts_loaded, sub_ids, counts)
+
+    def _counts_loaded(self, sub_ids: List[str], counts: dict) -> None:
+        self.pending_counts.difference_update(sub_ids)
+        self.counts.update(counts)
+        if any(sub_id in counts for sub_id in self.shown_ids):
+            self.refresh_list()
+
+    @on(Input.Changed, "#sub-search")
+    def do_search(self) -> None:
+        self.refresh_list()
+
+    @on(SelectionList.SelectionToggled, "#sub-list")
+    def do_toggle(self, event: SelectionList.SelectionToggled) -> None:
+        sub_id = event.selection.value
+        if sub_id in self.selected:
+            self.selected.discard(sub_id)
+        else:
+            self.selected.add(sub_id)
+
     @on(Button.Pressed, "#cancel")
     def cancel(self) -> None:
         self.app.pop_screen()
 
     @on(Button.Pressed, "#select")
     def do_select(self) -> None:
-        selection = self.query_one("#sub-list", SelectionList)
-        selected = list(selection.selected)
+        selected = sorted(self.selected)
         self.app.pop_screen()
         if selected:
-            self.callback(selected[0])
+            self.callback(selected)
 
     def action_cancel(self) -> None:
         self.app.pop_screen()
@@ -95,6 +227,12 @@ class ResourceSelectScreen(Screen):
         ("nic", "Network Interfaces"),
         ("publicip", "Public IPs"),
         ("nsg", "Network Security Groups"),
+        ("vnet", "Empty Virtual Networks"),
+        ("lb", "Unused Load Balancers"),
+        ("appserviceplan", "Empty App Service Plans"),
+        ("snapshot", "Snapshots older than 30 days"),
+        ("image", "Custom Images"),
+        ("storage", "Storage Accounts"),
         ("resource_group", "Empty Resource Groups"),
     ]
 
@@ -106,7 +244,7 @@ class ResourceSelectScreen(Screen):
         with Container(id="select-dialog"):
             yield Static("Select resource types:", id="select-title")
             yield SelectionList[str](
-                *[Selection(name, value, True) for value, name in self.RESOURCES],
+                *[Selection(name, value, not CLEANERS[value].opt_in) for value, name in self.RESOURCES],
                 id="resource-list"
             )
             with Horizontal(id="select-buttons"):
@@ -129,6 +267,273 @@ class ResourceSelectScreen(Screen):
         self.app.pop_screen()
 
 
+@dataclass
+class ResultRow:
+    resource_id: str
+    resource_type: str
+    subscription: str
+    resource_group: str
+    name: str
+    status: str
+    error: str = ""
+
+    def field(self, key: str) -> str:
+        return {
+            "type": self.resource_type,
+            "sub": self.subscription,
+            "rg": self.resource_group,
+            "name": self.name,
+            "status": self.status,
+        }.get(key, "")
+
+    def matches(self, terms: List[tuple]) -> bool:
+        """Match `key:value` terms against one field, bare terms against any."""
+        for key, value in terms:
+            if key:
+                if value not in self.field(key).lower():
+                    return False
+            elif value not in f"{self.resource_type} {self.subscription} {self.resource_group} {self.name} {self.status}".lower():
+                return False
+        return True
+
+
+def parse_filter(text: str) -> List[tuple]:
+    terms = []
+    for token in text.lower().split():
+        key, sep, value = token.partition(":")
+        terms.append((key, value) if sep else ("", token))
+    return terms
+
+
+class ResultsTable(ScrollView, can_focus=True):
+    """Virtualised result table: only the visible lines are ever rendered.
+
+    Rows live in a plain list and the filtered view is a list of indices,
+    so neither appending 100k rows nor refiltering touches the widget tree.
+    """
+
+    COLUMNS = (("TYPE", 14), ("SUBSCRIPTION", 14), ("RESOURCE GROUP", 24), ("NAME", 32), ("STATUS", 10))
+    STATUS_STYLES = {
+        "done": Style(color="green"),
+        "failed": Style(color="red"),
+        "in_flight": Style(color="yellow"),
+        "skipped": Style(color="grey50"),
+    }
+
+    BINDINGS = [
+        Binding("up", "cursor_up", show=False),
+        Binding("down", "cursor_down", show=False),
+        Binding("pageup", "page_up", show=False),
+        Binding("pagedown", "page_down", show=False),
+        Binding("home", "first", show=False),
+        Binding("end", "last", show=False),
+        Binding("enter", "select", "Details"),
+    ]
+
+    cursor = reactive(0)
+
+    class Selected(Message):
+        def __init__(self, row: ResultRow):
+            super().__init__()
+            self.row = row
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.rows: List[ResultRow] = []
+        self.view: Optional[List[int]] = None  # None = unfiltered
+        self.terms: List[tuple] = []
+
+    def _visible_count(self) -> int:
+        return len(self.rows) if self.view is None else len(self.view)
+
+    def _row_at(self, index: int) -> ResultRow:
+        return self.rows[index if self.view is None else self.view[index]]
+
+    def _resize(self) -> None:
+        width = sum(w + 1 for _, w in self.COLUMNS)
+        self.virtual_size = Size(width, self._visible_count())
+        self.refresh()
+
+    def append(self, rows: List[ResultRow]) -> None:
+        start = len(self.rows)
+        self.rows.extend(rows)
+        if self.view is not None:
+            self.view.extend(i for i in range(start, len(self.rows)) if self.rows[i].matches(self.terms))
+        self._resize()
+
+    def refilter(self) -> None:
+        """Recompute the filtered view after row statuses changed."""
+        if self.view is not None:
+            self.view = [i for i, row in enumerate(self.rows) if row.matches(self.terms)]
+            self.cursor = min(self.cursor, max(0, len(self.view) - 1))
+        self._resize()
+
+    def set_filter(self, text: str) -> None:
+        self.terms = parse_filter(text)
+        self.view = [] if self.terms else None
+        self.cursor = 0
+        self.scroll_to(y=0, animate=False)
+        self.refilter()
+
+    def render_line(self, y: int) -> Strip:
+        scroll_x, scroll_y = self.scroll_offset
+        index = scroll_y + y
+        width = self.size.width
+        if index >= self._visible_count():
+            return Strip.blank(width)
+        row = self._row_at(index)
+        values = (row.resource_type, row.subscription[:8], row.resource_group, row.name, row.status)
+        base = Style(reverse=True) if index == self.cursor and self.has_focus else Style()
+        segments = []
+        for (_, col_width), value in zip(self.COLUMNS, values):
+            style = base + self.STATUS_STYLES.get(value, Style()) if value == row.status else base
+            segments.append(Segment(value[:col_width].ljust(col_width) + " ", style))
+        return Strip(segments).crop(scroll_x, scroll_x + width)
+
+    def watch_cursor(self, old: int, new: int) -> None:
+        _, scroll_y = self.scroll_offset
+        height = self.size.height
+        if new < scroll_y:
+            self.scroll_to(y=new, animate=False)
+        elif new >= scroll_y + height:
+            self.scroll_to(y=new - height + 1, animate=False)
+        self.refresh()
+
+    def _move(self, delta: int) -> None:
+        count = self._visible_count()
+        if count:
+            self.cursor = max(0, min(count - 1, self.cursor + delta))
+
+    def action_cursor_up(self) -> None:
+        self._move(-1)
+
+    def action_cursor_down(self) -> None:
+        self._move(1)
+
+    def action_page_up(self) -> None:
+        self._move(-max(1, self.size.height))
+
+    def action_page_down(self) -> None:
+        self._move(max(1, self.size.height))
+
+    def action_first(self) -> None:
+        self._move(-self._visible_count())
+
+    def action_last(self) -> None:
+        self._move(self._visible_count())
+
+    def action_select(self) -> None:
+        if self._visible_count():
+            self.post_message(self.Selected(self._row_at(self.cursor)))
+
+
+class ProgressScreen(Screen):
+    """Live view of a running cleanup, fed by polling a ProgressTracker."""
+
+    BINDINGS = [("escape", "back", "Back"), ("/", "focus_filter", "Filter")]
+    POLL_INTERVAL = 0.5
+
+    def __init__(self, progress: ProgressTracker, dry_run: bool):
+        super().__init__()
+        self.progress = progress
+        self.dry_run = dry_run
+        self.cursor = 0
+        self.index: dict = {}
+
+    def compose(self) -> ComposeResult:
+        with Vertical(id="progress"):
+            yield Static("", id="progress-summary")
+            yield DataTable(id="progress-types", cursor_type="row")
+            yield Input(placeholder="Filter: text or type:/sub:/rg:/name:/status: terms", id="results-filter")
+            with Horizontal(id="results-header"):
+                yield Static(" ".join(name.ljust(w) for name, w in ResultsTable.COLUMNS))
+            yield ResultsTable(id="results")
+            yield Static("", id="result-detail")
+        yield Footer()
+
+    def on_mount(self) -> None:
+        table = self.query_one("#progress-types", DataTable)
+        table.add_columns("Type", "Subscription", "Discovered", "Queued", "In flight", "Done", "Failed", "Skipped", "Deferred")
+        self.set_interval(self.POLL_INTERVAL, self.poll)
+
+    def poll(self) -> None:
+        events, self.cursor = self.progress.events_since(self.cursor)
+        results = self.query_one("#results", ResultsTable)
+        new_rows = []
+        for event in events:
+            row = self.index.get(event.resource_id)
+            if row is None:
+                parts = event.resource_id.split("/")
+                row = ResultRow(
+                    resource_id=event.resource_id,
+                    resource_type=event.resource_type,
+                    subscription=event.subscription,
+                    resource_group=parts[4] if len(parts) > 4 else "",
+                    name=parts[-1],
+                    status=event.status,
+                )
+                self.index[event.resource_id] = row
+                new_rows.append(row)
+            row.status = event.status
+            row.error = event.error or row.error
+        if results.view is not None and events:
+            results.rows.extend(new_rows)
+            results.refilter()
+        elif new_rows:
+            results.append(new_rows)
+        elif events:
+            results.refresh()
+        self.render_summary()
+
+    def render_summary(self) -> None:
+        snap = self.progress.snapshot()
+        totals = snap.totals
+        eta = f"{snap.eta:.0f}s" if snap.eta is not None else "-"
+        mode = "DRY-RUN" if self.dry_run else "LIVE"
+        self.query_one("#progress-summary", Static).update(
+            f"[b]{mode}[/b] {snap.phase}  |  discovered {snap.discovered}  queued {totals.get('queued', 0)}  "
+            f"in flight {totals.get('in_flight', 0)}  done {totals.get('done', 0)}  "
+            f"failed {totals.get('failed', 0)}  |  {snap.throughput:.1f}/s  ETA {eta}  "
+            f"throttled {snap.throttled}  elapsed {snap.elapsed:.0f}s"
+        )
+        table = self.query_one("#progress-types", DataTable)
+        cursor_row = table.cursor_row
+        table.clear()
+        for (res_type, sub), counts in sorted(snap.counts.items()):
+            table.add_row(
+                res_type, sub[:8], *(str(counts.get(k, 0)) for k in
+                                     ("discovered", "queued", "in_flight", "done", "failed", "skipped", "deferred")),
+                key=f"{res_type}|{sub}",
+            )
+        if table.row_count:
+            table.move_cursor(row=min(cursor_row, table.row_count - 1))
+
+    @on(DataTable.RowSelected, "#progress-types")
+    def drill_down(self, event: DataTable.RowSelected) -> None:
+        res_type, _, sub = event.row_key.value.partition("|")
+        filt = self.query_one("#results-filter", Input)
+        filt.value = f"type:{res_type} sub:{sub}"
+        self.query_one("#results", ResultsTable).focus()
+
+    @on(Input.Changed, "#results-filter")
+    def apply_filter(self, event: Input.Changed) -> None:
+        self.query_one("#results", ResultsTable).set_filter(event.value)
+
+    @on(ResultsTable.Selected)
+    def show_detail(self, event: ResultsTable.Selected) -> None:
+        row = event.row
+        detail = f"{row.resource_id}\nstatus: {row.status}"
+        if row.error:
+            detail += f"\nerror: {row.error}"
+        self.query_one("#result-detail", Static).update(detail)
+
+    def action_focus_filter(self) -> None:
+        self.query_one("#results-filter", Input).focus()
+
+    def action_back(self) -> None:
+        self.app.pop_screen()
+
+
 class AzureWipeApp(App):
     CSS = """
     Screen { align: center middle; }
@@ -140,9 +545,18 @@ class AzureWipeApp(App):
     #confirm-message, #select-title { text-align: center; padding-bottom: 1; }
     #confirm-buttons, #select-buttons { align: center middle; height: 3; }
     #confirm-buttons Button, #select-buttons Button { width: auto; margin: 0 1; }
-    #confirm-input { margin-bottom: 1; }
+    #confirm-input, #sub-search { margin-bottom: 1; }
+    #sub-status { color: grey; padding-bottom: 1; }
+    SubscriptionSelectScreen #select-dialog { width: 90; }
     SelectionList { height: 12; margin-bottom: 1; }
     #status { text-align: center; color: yellow; padding-top: 1; }
+    #progress { width: 100%; height: 100%; }
+    #progress-summary { height: auto; padding: 0 1; }
+    #progress-types { height: 8; }
+    #results-header { height: 1; text-style: bold; padding: 0 0; }
+    #results-header Static { width: auto; }
+    ResultsTable { height: 1fr; }
+    #result-detail { height: auto; max-height: 4; padding: 0 1; color: grey; }
     """
 
     BINDINGS = [Binding("q", "quit", "Quit")]
@@ -171,11 +585,20 @@ class AzureWipeApp(App):
     def set_status(self, msg: str) -> None:
         self.query_one("#status", Static).update(msg)
 
-    @work(thread=True)
     def run_cleanup(self, config: Config) -> None:
+        progress = ProgressTracker()
+        self.push_screen(ProgressScreen(progress, config.dry_run))
+        self._run_cleanup(config, progress)
+
+    @work(thread=True)
+    def _run_cleanup(self, config: Config, progress: ProgressTracker) -> None:
         self.call_from_thread(self.set_status, "Running cleanup...")
-        cleaner = AzureResourceCleaner(config, self.credential)
-        cleaner.purge()
+        cleaner = AzureResourceCleaner(config, self.credential, progress)
+        try:
+            cleaner.purge(show_report=False)
+        except Exception as e:
+            self.call_from_thread(self.set_status, f"Failed: {e}")
+            return
         self.call_from_thread(self.set_status, "Done!")
 
     @on(Button.Pressed, "#exit")
@@ -190,17 +613,16 @@ class AzureWipeApp(App):
 
     @on(Button.Pressed, "#subscription")
     def do_subscription(self) -> None:
-        subs = self.graph.list_subscriptions()
-
-        def on_sub(sub_id: str):
+        def on_subs(sub_ids: list[str]):
             def on_confirm():
                 config = Config()
                 config.dry_run = False
-                config.subscriptions = [sub_id]
+                config.subscriptions = sub_ids
                 self.run_cleanup(config)
-            self.push_screen(ConfirmScreen(f"Delete ALL in subscription {sub_id[:8]}...?", on_confirm))
+            target = f"subscription {sub_ids[0][:8]}..." if len(sub_ids) == 1 else f"{len(sub_ids)} subscriptions"
+            self.push_screen(ConfirmScreen(f"Delete ALL in {target}?", on_confirm))
 
-        self.push_screen(SubscriptionSelectScreen(subs, on_sub))
+        self.push_screen(SubscriptionSelectScreen(self.graph, on_subs))
 
     @on(Button.Pressed, "#nuke")
     def do_nuke(self) -> None:
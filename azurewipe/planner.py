@@ -0,0 +1,356 @@
+"""What-if planner: evaluate many configs against one inventory snapshot.
+
+The inventory is loaded once into a dictionary-encoded columnar table.
+Each config is then evaluated with numpy array lookups: resource group,
+subscription and tag filters run once per distinct value, name globs scan
+only their literal prefix/suffix range, and masks for repeated filters
+are shared between configs.
+"""
+import bisect
+import fnmatch
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from azurewipe.core.config import Config, parse_timestamp
+from azurewipe.core.graph import ResourceGraphQuery
+from azurewipe.core.inventory import Inventory
+from azurewipe.core.pricing import estimate_monthly_cost
+from azurewipe.resources import CLEANERS, SpecCleaner
+
+
+def _encode(values: List[str]) -> Tuple[np.ndarray, List[str]]:
+    """Dictionary-encode a column: integer codes plus the distinct values."""
+    index: Dict[str, int] = {}
+    codes = np.fromiter((index.setdefault(v, len(index)) for v in values), dtype=np.int32, count=len(values))
+    return codes, list(index)
+
+
+def _glob_to_line_regex(pattern: str) -> "re.Pattern":
+    """Compile a glob into a regex matching whole lines of a newline-joined column.
+
+    Same rules as fnmatch.fnmatchcase, except wildcards never cross a newline.
+    """
+    out, i, n = [], 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        i += 1
+        if c == "*":
+            out.append(r"[^\n]*")
+        elif c == "?":
+            out.append(r"[^\n]")
+        elif c == "[":
+            j = i
+            if j < n and pattern[j] == "!":
+                j += 1
+            if j < n and pattern[j] == "]":
+                j += 1
+            j = pattern.find("]", j)
+            if j < 0:
+                out.append(r"\[")
+                continue
+            # Escape what fnmatch escapes, so the class can't read as a nested set
+            body = re.sub(r"([&~|])", r"\\\1", pattern[i:j].replace("\\", r"\\"))
+            i = j + 1
+            if body.startswith("!"):
+                body = "^" + body[1:] + r"\n"
+            elif body[:1] in ("^", "["):
+                body = "\\" + body
+            out.append(f"[{body}]")
+        else:
+            out.append(re.escape(c))
+    return re.compile("^" + "".join(out) + "$", re.MULTILINE)
+
+
+def _glob_prefix(pattern: str) -> str:
+    match = re.search(r"[*?\[]", pattern)
+    return pattern[:match.start()] if match else pattern
+
+
+def _glob_suffix(pattern: str) -> str:
+    match = re.search(r"[*?\]]", pattern[::-1])
+    return pattern[len(pattern) - match.start():] if match else pattern
+
+
+def _prefix_range(sorted_values: List[str], prefix: str) -> Tuple[int, int]:
+    if not prefix:
+        return 0, len(sorted_values)
+    return (bisect.bisect_left(sorted_values, prefix),
+            bisect.bisect_left(sorted_values, prefix + "\U0010ffff"))
+
+
+class InventoryTable:
+    """Columnar inventory of deletion candidates across all cleaner types."""
+
+    def __init__(self, rows: List[Dict[str, Any]]):
+        self.size = len(rows)
+        self.ids = [r["id"] for r in rows]
+        self.names = [r.get("name", "") for r in rows]
+        self.kind, self.kinds = _encode([r["_kind"] for r in rows])
+        self.sub, self.subs = _encode([r.get("subscriptionId", "") for r in rows])
+        self.rg, self.rgs = _encode([r.get("resourceGroup", "") for r in rows])
+        self.cost = np.fromiter(
+            (estimate_monthly_cost(r["_kind"], r) for r in rows), dtype=np.float64, count=len(rows)
+        )
+        # Epoch seconds, NaN when unknown (so every age comparison is False)
+        self.now = time.time()
+        self.created = self._timestamps(rows, "createdAt")
+        self.idle_since = self._timestamps(rows, "idleSince")
+
+        # Names are mostly unique, so keep them sorted (and reversed-sorted)
+        # for literal prefix/suffix range lookups, plus one newline-joined
+        # blob so a glob over a range is a single C-level regex scan
+        self._name_order = np.array(sorted(range(self.size), key=self.names.__getitem__), dtype=np.int64)
+        self._sorted_names = [self.names[i] for i in self._name_order]
+        self._rev_order = np.array(sorted(range(self.size), key=lambda i: self.names[i][::-1]), dtype=np.int64)
+        self._sorted_rev = [self.names[i][::-1] for i in self._rev_order]
+        self._name_blob = "\n".join(self._sorted_names)
+        lengths = np.fromiter((len(n) + 1 for n in self._sorted_names), dtype=np.int64, count=self.size)
+        self._name_starts = np.concatenate(([0], np.cumsum(lengths)[:-1])) if self.size else lengths
+
+        # Sparse tag columns: key -> (row indices, value codes, distinct values)
+        tag_rows: Dict[str, Tuple[List[int], List[str]]] = {}
+        for i, r in enumerate(rows):
+            for key, value in (r.get("tags") or {}).items():
+                entry = tag_rows.setdefault(key, ([], []))
+                entry[0].append(i)
+                entry[1].append(value)
+        self.tags: Dict[str, Tuple[np.ndarray, np.ndarray, List[str]]] = {}
+        for key, (idx, values) in tag_rows.items():
+            codes, distinct = _encode(values)
+            self.tags[key] = (np.array(idx, dtype=np.int64), codes, distinct)
+
+    @classmethod
+    def load(cls, graph: ResourceGraphQuery, subscriptions: List[str]) -> "InventoryTable":
+        """Fetch candidates for every cleaner type: one batched query plus empty RGs."""
+        specs = [c.spec for c in CLEANERS.values() if issubclass(c, SpecCleaner)]
+        rows = []
+        for kind, found in graph.discover(specs, subscriptions).items():
+            for r in found:
+                r["_kind"] = kind
+                rows.append(r)
+        if "resource_group" in CLEANERS:
+            for r in Inventory.load(graph, subscriptions).empty_groups():
+                r["_kind"] = "resource_group"
+                rows.append(r)
+        logging.info(f"Loaded {len(rows)} candidates into the planning inventory")
+        return cls(rows)
+
+    def lookup(self, distinct: List[str], predicate) -> np.ndarray:
+        """Boolean lookup table over a column's distinct values."""
+        return np.fromiter((predicate(v) for v in distinct), dtype=bool, count=len(distinct))
+
+    def name_mask(self, pattern: str) -> np.ndarray:
+        """Rows whose name matches a glob, scanning only its literal prefix or suffix range."""
+        mask = np.zeros(self.size, dtype=bool)
+        lo, hi = _prefix_range(self._sorted_names, _glob_prefix(pattern))
+        rev_lo, rev_hi = _prefix_range(self._sorted_rev, _glob_suffix(pattern)[::-1])
+        if rev_hi - rev_lo < (hi - lo) // 4:
+            regex = re.compile(fnmatch.translate(pattern))
+            hits = [i for i in self._rev_order[rev_lo:rev_hi].tolist() if regex.match(self.names[i])]
+            mask[hits] = True
+            return mask
+        if lo >= hi:
+            return mask
+        start = int(self._name_starts[lo])
+        end = int(self._name_starts[hi - 1]) + len(self._sorted_names[hi - 1])
+        offsets = [m.start() for m in _glob_to_line_regex(pattern).finditer(self._name_blob, start, end)]
+        positions = np.searchsorted(self._name_starts, np.array(offsets, dtype=np.int64))
+        mask[self._name_order[positions]] = True
+        return mask
+
+    @staticmethod
+    def _timestamps(rows: List[Dict[str, Any]], column: str) -> np.ndarray:
+        parsed = (parse_timestamp(r.get(column)) for r in rows)
+        return np.fromiter((np.nan if t is None else t for t in parsed), dtype=np.float64, count=len(rows))
+
+    def expired_mask(self, key: str) -> np.ndarray:
+        """Rows whose `key` tag holds a date that has passed."""
+        mask = np.zeros(self.size, dtype=bool)
+        if key in self.tags:
+            idx, codes, distinct = self.tags[key]
+            expired = self.lookup(distinct, lambda v: (parse_timestamp(v) or np.inf) <= self.now)
+            mask[idx[expired[codes]]] = True
+        return mask
+
+    def tag_mask(self, key: str, values: List[str]) -> np.ndarray:
+        mask = np.zeros(self.size, dtype=bool)
+        if key in self.tags:
+            idx, codes, distinct = self.tags[key]
+            wanted = set(values)
+            mask[idx[self.lookup(distinct, wanted.__contains__)[codes]]] = True
+        return mask
+
+
+@dataclass
+class PlanResult:
+    name: str
+    mask: np.ndarray
+    counts: Dict[str, int] = field(default_factory=dict)
+    savings: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    @property
+    def total_savings(self) -> float:
+        return sum(self.savings.values())
+
+
+class Planner:
+    """Evaluates batches of Configs against one InventoryTable."""
+
+    def __init__(self, inventory: InventoryTable):
+        self.inv = inventory
+        self._cache: Dict[tuple, np.ndarray] = {}
+
+    def _cached(self, key: tuple, build) -> np.ndarray:
+        if key not in self._cache:
+            self._cache[key] = build()
+        return self._cache[key]
+
+    def _type_mask(self, config: Config) -> np.ndarray:
+        if "all" in config.resource_types:
+            wanted = {t for t, c in CLEANERS.items() if not c.opt_in}
+        else:
+            wanted = set(config.resource_types)
+        key = ("types", frozenset(wanted))
+        return self._cached(key, lambda: self.inv.lookup(self.inv.kinds, wanted.__contains__)[self.inv.kind])
+
+    def _subscription_mask(self, config: Config) -> Optional[np.ndarray]:
+        if "all" in config.subscriptions:
+            return None
+        wanted = {s.lower() for s in config.subscriptions}
+        key = ("subs", frozenset(wanted))
+        return self._cached(key, lambda: self.inv.lookup(
+            self.inv.subs, lambda s: s.lower() in wanted)[self.inv.sub])
+
+    def _rg_mask(self, config: Config) -> Optional[np.ndarray]:
+        if "all" in config.resource_groups:
+            return None
+        patterns = tuple(config.resource_groups)
+        regex = re.compile("|".join(f"(?:{fnmatch.translate(p)})" for p in patterns))
+        return self._cached(("rgs", patterns), lambda: self.inv.lookup(
+            self.inv.rgs, lambda rg: bool(regex.match(rg)))[self.inv.rg])
+
+    def _excluded_names(self, config: Config) -> Optional[np.ndarray]:
+        if not config.exclude_patterns:
+            return None
+        masks = [self._cached(("name", p), lambda p=p: self.inv.name_mask(p)) for p in config.exclude_patterns]
+        return np.logical_or.reduce(masks)
+
+    def _tag_masks(self, filters: Dict[str, List[str]]) -> Optional[np.ndarray]:
+        if not filters:
+            return None
+        masks = [
+            self._cached(("tag", k, frozenset(v)), lambda k=k, v=v: self.inv.tag_mask(k, v))
+            for k, v in filters.items()
+        ]
+        return np.logical_or.reduce(masks)
+
+    def _lifetime_masks(self, config: Config) -> List[np.ndarray]:
+        masks = []
+        if config.min_age is not None:
+            masks.append(self._cached(("age", config.min_age),
+                                      lambda: self.inv.now - self.inv.created >= config.min_age))
+        if config.min_idle is not None:
+            masks.append(self._cached(("idle", config.min_idle),
+                                      lambda: self.inv.now - self.inv.idle_since >= config.min_idle))
+        if config.expiry_tag:
+            masks.append(self._cached(("expiry", config.expiry_tag),
+                                      lambda: self.inv.expired_mask(config.expiry_tag)))
+        return masks
+
+    def mask(self, config: Config) -> np.ndarray:
+        """Rows a run of `config` would delete.
+
+        With policies, each row goes to the first policy that accepts it,
+        as in the cleaner; rows claimed by a report-only policy are not
+        deleted.
+        """
+        if not config.policies:
+            return self._filter_mask(config)
+        claimed = np.zeros(self.inv.size, dtype=bool)
+        deleted = np.zeros(self.inv.size, dtype=bool)
+        for policy, resolved in zip(config.policies, config.resolve_policies()):
+            matched = self._filter_mask(resolved) & ~claimed
+            claimed |= matched
+            if not policy.dry_run:
+                deleted |= matched
+        return deleted
+
+    def _filter_mask(self, config: Config) -> np.ndarray:
+        """Rows `config` accepts, mirroring ResourceCleaner.should_delete."""
+        mask = self._type_mask(config).copy()
+        scopes = [config] if config.within is None else [config, config.within]
+        for scope in scopes:
+            for part in (self._subscription_mask(scope), self._rg_mask(scope)):
+                if part is not None:
+                    mask &= part
+        if config.within is not None and "all" not in config.within.resource_types:
+            mask &= self._type_mask(config.within)
+        excluded = self._excluded_names(config)
+        if excluded is not None:
+            mask &= ~excluded
+        tag_excluded = self._tag_masks(config.tag_filters.exclude)
+        if tag_excluded is not None:
+            mask &= ~tag_excluded
+        tag_included = self._tag_masks(config.tag_filters.include)
+        if tag_included is not None:
+            mask &= tag_included
+        for part in self._lifetime_masks(config):
+            mask &= part
+        return mask
+
+    def evaluate(self, configs: Dict[str, Config]) -> List[PlanResult]:
+        results = []
+        n_kinds = len(self.inv.kinds)
+        for name, config in configs.items():
+            mask = self.mask(config)
+            kinds = self.inv.kind[mask]
+            counts = np.bincount(kinds, minlength=n_kinds)
+            savings = np.bincount(kinds, weights=self.inv.cost[mask], minlength=n_kinds)
+            results.append(PlanResult(
+                name=name,
+                mask=mask,
+                counts={k: int(counts[i]) for i, k in enumerate(self.inv.kinds) if counts[i]},
+                savings={k: float(savings[i]) for i, k in enumerate(self.inv.kinds) if savings[i]},
+            ))
+        return results
+
+    def diff(self, a: PlanResult, b: PlanResult) -> Tuple[List[str], List[str]]:
+        """Resource IDs only `a` would delete, and only `b` would delete."""
+        only_a = np.flatnonzero(a.mask & ~b.mask)
+        only_b = np.flatnonzero(b.mask & ~a.mask)
+        return [self.inv.ids[i] for i in only_a], [self.inv.ids[i] for i in only_b]
+
+
+def format_matrix(results: List[PlanResult]) -> str:
+    """Render per-config counts by type plus estimated savings as a text table."""
+    kinds = [t for t in CLEANERS if any(t in r.counts for r in results)]
+    width = max([len(r.name) for r in results] + [6])
+    lines = [" ".join(["config".ljust(width)] + [k[:8].rjust(8) for k in kinds] + ["total".rjust(8), "$/month".rjust(12)])]
+    for r in results:
+        cells = [str(r.counts.get(k, 0)).rjust(8) for k in kinds]
+        lines.append(" ".join([r.name.ljust(width)] + cells + [str(r.total).rjust(8), f"{r.total_savings:,.2f}".rjust(12)]))
+    return "\n".join(lines)
+
+
+def print_what_if(planner: Planner, configs: Dict[str, Config], sample: int = 5) -> None:
+    """Print the config matrix and each config's difference from the first."""
+    results = planner.evaluate(configs)
+    print("\n=== What-if Plan ===")
+    print(format_matrix(results))
+    baseline = results[0]
+    for r in results[1:]:
+        only_base, only_r = planner.diff(baseline, r)
+        print(f"\n{r.name} vs {baseline.name}: +{len(only_r)} / -{len(only_base)}")
+        for res_id in only_r[:sample]:
+            print(f"  + {res_id}")
+        for res_id in only_base[:sample]:
+            print(f"  - {res_id}")
@@ -1,15 +1,24 @@
 """Resource cleaners for Azure."""
-from .base import ResourceCleaner
-from .disk import DiskCleaner
-from .network import NICCleaner, PublicIPCleaner, NSGCleaner
-from .vm import VMCleaner
+from .base import ResourceCleaner, DeleteResult, DeleteStatus
+from .spec import CleanerSpec, SpecCleaner
+from .disk import DiskCleaner, SnapshotCleaner
+from .network import NICCleaner, PublicIPCleaner, NSGCleaner, VNetCleaner, LoadBalancerCleaner
+from .vm import VMCleaner, ImageCleaner
+from .storage import StorageAccountCleaner
+from .appservice import AppServicePlanCleaner
 from .resource_group import ResourceGroupCleaner
 
 CLEANERS = {
     "disk": DiskCleaner,
+    "snapshot": SnapshotCleaner,
     "nic": NICCleaner,
     "publicip": PublicIPCleaner,
     "nsg": NSGCleaner,
+    "vnet": VNetCleaner,
+    "lb": LoadBalancerCleaner,
     "vm": VMCleaner,
+    "image": ImageCleaner,
+    "storage": StorageAccountCleaner,
+    "appserviceplan": AppServicePlanCleaner,
     "resource_group": ResourceGroupCleaner,
 }
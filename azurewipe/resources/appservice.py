@@ -0,0 +1,18 @@
+"""App Service plan cleaner."""
+from azure.mgmt.resource import ResourceManagementClient
+from .spec import CleanerSpec, SpecCleaner, by_id
+
+
+class AppServicePlanCleaner(SpecCleaner):
+    # Deleted through the generic resources API to avoid an azure-mgmt-web dependency
+    spec = CleanerSpec(
+        resource_type="appserviceplan",
+        arm_type="microsoft.web/serverfarms",
+        predicate="toint(properties.numberOfSites) == 0",
+        client=ResourceManagementClient,
+        operation="resources.begin_delete_by_id",
+        noun="App Service plan",
+        label="empty App Service plans",
+        fields={"skuName": "tostring(sku.name)"},
+        args=by_id("2022-09-01"),
+    )
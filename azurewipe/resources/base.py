@@ -1,8 +1,49 @@
 """Base class for resource cleaners."""
+import logging
+import threading
+import time
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from dataclasses import dataclass
+from enum import Enum
+from typing import Callable, List, Dict, Any, Optional, Tuple
 from azure.core.credentials import TokenCredential
+from azure.core.exceptions import HttpResponseError, ResourceNotFoundError
 from azurewipe.core.config import Config
+from azurewipe.core.pricing import estimate_monthly_cost
+from azurewipe.core.retry import DEADLINE_OPTION
+from azurewipe.core.profiling import phase
+from azurewipe.core.progress import ProgressTracker
+from azurewipe.scheduler import RunBudget
+
+
+class DeleteStatus(Enum):
+    DELETED = "deleted"
+    ALREADY_GONE = "already_gone"  # 404: deleted earlier, possibly by our own first attempt
+    SKIPPED = "skipped"
+    THROTTLED = "throttled"  # Retries or retry budget exhausted on 429/503
+    TIMED_OUT = "timed_out"  # Submitted, but not confirmed within the wait timeout
+    FAILED = "failed"
+
+
+@dataclass
+class DeleteResult:
+    status: DeleteStatus
+    error: str = ""
+    status_code: Optional[int] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status in (DeleteStatus.DELETED, DeleteStatus.ALREADY_GONE)
+
+    @classmethod
+    def from_error(cls, error: Exception) -> "DeleteResult":
+        code = getattr(error, "status_code", None)
+        # A 404 while polling the delete arrives as a plain HttpResponseError
+        if isinstance(error, ResourceNotFoundError) or (isinstance(error, HttpResponseError) and code == 404):
+            return cls(DeleteStatus.ALREADY_GONE, status_code=404)
+        if isinstance(error, HttpResponseError) and code in (429, 503):
+            return cls(DeleteStatus.THROTTLED, str(error), code)
+        return cls(DeleteStatus.FAILED, str(error), code)
 
 
 class ResourceCleaner(ABC):
@@ -10,11 +51,20 @@ class ResourceCleaner(ABC):
 
     resource_type: str = ""
     dependencies: List[str] = []  # Must be deleted before this
+    opt_in: bool = False  # Skipped unless listed explicitly in resource_types
 
-    def __init__(self, credential: TokenCredential, config: Config):
+    def __init__(self, credential: TokenCredential, config: Config,
+                 progress: Optional[ProgressTracker] = None, budget: Optional[RunBudget] = None):
         self.credential = credential
         self.config = config
-        self.report = {"deleted": [], "failed": [], "skipped": []}
+        self.progress = progress
+        self.budget = budget
+        self.report = {"deleted": [], "failed": [], "skipped": [], "deferred": [], "savings": 0.0}
+        self._report_lock = threading.Lock()  # process() may run on several threads
+
+    def _record(self, resource: Dict[str, Any], status: str, error: str = "") -> None:
+        if self.progress:
+            self.progress.record(resource, self.resource_type, status, error)
 
     @abstractmethod
     def discover(self, subscriptions: List[str]) -> List[Dict[str, Any]]:
@@ -22,10 +72,42 @@ class ResourceCleaner(ABC):
         pass
 
     @abstractmethod
-    def delete(self, resource: Dict[str, Any]) -> bool:
-        """Delete a single resource. Returns True on success."""
+    def delete(self, resource: Dict[str, Any]) -> DeleteResult:
+        """Delete a single resource."""
         pass
 
+    def _run_delete(self, noun: str, name: str, operation: Callable, *args) -> DeleteResult:
+        """Call a delete operation and wait for it, mapping errors to a DeleteResult.
+
+        Retries happen per HTTP request inside the client pipeline, so
+        nothing here re-submits the delete. Submitting (with its retries)
+        and waiting are each bounded by the run budget (or
+        `operation_timeout`); an operation still running after that keeps
+        going in Azure and is reported as timed out.
+        """
+        logging.info(f"Deleting {noun} {name}")
+        timeout = self.budget.wait_timeout() if self.budget else self.config.operation_timeout
+        # Caps the pipeline's retries and Retry-After sleeps, also while polling
+        kwargs = {DEADLINE_OPTION: time.monotonic() + timeout} if timeout is not None else {}
+        try:
+            with phase("submit"):
+                result = operation(*args, **kwargs)
+            if hasattr(result, "result"):  # Long-running operation
+                with phase("poll"):
+                    result.result(timeout)
+                if not result.done():
+                    logging.warning(f"Gave up waiting for {noun} {name} after {timeout:.0f}s")
+                    return DeleteResult(DeleteStatus.TIMED_OUT, "timed out waiting for delete")
+        except Exception as e:
+            outcome = DeleteResult.from_error(e)
+            if outcome.ok:
+                logging.info(f"{noun} {name} already deleted")
+            else:
+                logging.error(f"Failed to delete {noun} {name}: {e}")
+            return outcome
+        logging.info(f"Deleted {noun} {name}")
+        return DeleteResult(DeleteStatus.DELETED)
+
     def should_delete(self, resource: Dict[str, Any]) -> bool:
         """Check if resource should be deleted based on config."""
         name = resource.get("name", "")
@@ -38,20 +120,67 @@ class ResourceCleaner(ABC):
             return False
         if not self.config.should_include_rg(rg):
             return False
+        if not self.config.should_include_subscription(resource.get("subscriptionId", "")):
+            return False
+        if not self.config.matches_lifetime(resource, time.time()):
+            return False
         return True
 
-    def clean(self, subscriptions: List[str]) -> Dict[str, List]:
-        """Discover and delete resources."""
-        resources = self.discover(subscriptions)
+    def select(self, resources: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Split resources into the ones this cleaner's filters accept and the rest."""
+        matched, rest = [], []
         for res in resources:
-            if not self.should_delete(res):
-                self.report["skipped"].append(res["id"])
-                continue
-            if self.config.dry_run:
-                self.report["deleted"].append(res["id"])  # Would delete
-            else:
-                if self.delete(res):
-                    self.report["deleted"].append(res["id"])
-                else:
-                    self.report["failed"].append(res["id"])
-        return self.report
+            (matched if self.should_delete(res) else rest).append(res)
+        return matched, rest
+
+    def admit(self, resources: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Queue selected resources, tagging them with the policy and estimated cost."""
+        for res in resources:
+            self._record(res, "discovered")
+            res["policy"] = self.config.name
+            res["monthlyCost"] = estimate_monthly_cost(self.resource_type, res)
+            self._record(res, "queued")
+        return resources
+
+    def skip(self, resources: List[Dict[str, Any]]) -> None:
+        """Record resources that no filter selected."""
+        for res in resources:
+            self._record(res, "discovered")
+            self.report["skipped"].append(res["id"])
+            self._record(res, "skipped")
+
+    def process(self, resource: Dict[str, Any],
+                delete: Optional[Callable[[Dict[str, Any]], DeleteResult]] = None) -> bool:
+        """Delete (or pretend to, in dry-run) one planned resource.
+
+        `delete` replaces `self.delete`, e.g. to run it in a worker process.
+        """
+        if self.config.dry_run:
+            self._add("deleted", resource)  # Would delete
+            self._record(resource, "done")
+            return True
+        self._record(resource, "in_flight")
+        result = (delete or self.delete)(resource)
+        if result.ok:
+            self._add("deleted", resource)
+            self._record(resource, "done")
+        elif result.status is DeleteStatus.SKIPPED:
+            self._add("skipped", resource)
+            self._record(resource, "skipped", result.error)
+        elif result.status is DeleteStatus.TIMED_OUT:
+            self.defer(resource, result.error)
+        else:
+            self._add("failed", resource)
+            self._record(resource, "failed", result.error)
+        return result.ok
+
+    def _add(self, outcome: str, resource: Dict[str, Any]) -> None:
+        with self._report_lock:
+            self.report[outcome].append(resource["id"])
+            if outcome == "deleted":
+                self.report["savings"] += resource.get("monthlyCost", 0.0)
+
+    def defer(self, resource: Dict[str, Any], reason: str = "") -> None:
+        """Leave a planned resource for a later run (budget exhausted or timed out)."""
+        self._add("deferred", resource)
+        self._record(resource, "deferred", reason)
@@ -1,102 +1,87 @@
-"""Network resource cleaners (NICs, Public IPs, NSGs)."""
-import logging
-from typing import List, Dict, Any
+"""Network resource cleaners (NICs, Public IPs, NSGs, VNets, Load Balancers)."""
 from azure.mgmt.network import NetworkManagementClient
-from azure.core.credentials import TokenCredential
-from azurewipe.core.config import Config
-from azurewipe.core.graph import ResourceGraphQuery
-from azurewipe.core.retry import retry_with_backoff
-from .base import ResourceCleaner
-
-
-class NICCleaner(ResourceCleaner):
-    resource_type = "nic"
-    dependencies = ["vm"]
-
-    def __init__(self, credential: TokenCredential, config: Config):
-        super().__init__(credential, config)
-        self.graph = ResourceGraphQuery(credential)
-
-    def discover(self, subscriptions: List[str]) -> List[Dict[str, Any]]:
-        logging.info("Discovering orphan NICs...")
-        nics = self.graph.find_orphan_nics(subscriptions)
-        logging.info(f"Found {len(nics)} orphan NICs")
-        return nics
-
-    @retry_with_backoff()
-    def delete(self, resource: Dict[str, Any]) -> bool:
-        sub_id = resource["subscriptionId"]
-        rg = resource["resourceGroup"]
-        name = resource["name"]
-
-        logging.info(f"Deleting NIC {name}")
-        try:
-            client = NetworkManagementClient(self.credential, sub_id)
-            poller = client.network_interfaces.begin_delete(rg, name)
-            poller.result()
-            return True
-        except Exception as e:
-            logging.error(f"Failed to delete NIC {name}: {e}")
-            return False
-
-
-class PublicIPCleaner(ResourceCleaner):
-    resource_type = "publicip"
-    dependencies = ["nic", "vm"]
-
-    def __init__(self, credential: TokenCredential, config: Config):
-        super().__init__(credential, config)
-        self.graph = ResourceGraphQuery(credential)
-
-    def discover(self, subscriptions: List[str]) -> List[Dict[str, Any]]:
-        logging.info("Discovering unused Public IPs...")
-        ips = self.graph.find_unused_public_ips(subscriptions)
-        logging.info(f"Found {len(ips)} unused Public IPs")
-        return ips
-
-    @retry_with_backoff()
-    def delete(self, resource: Dict[str, Any]) -> bool:
-        sub_id = resource["subscriptionId"]
-        rg = resource["resourceGroup"]
-        name = resource["name"]
-
-        logging.info(f"Deleting Public IP {name}")
-        try:
-            client = NetworkManagementClient(self.credential, sub_id)
-            poller = client.public_ip_addresses.begin_delete(rg, name)
-            poller.result()
-            return True
-        except Exception as e:
-            logging.error(f"Failed to delete Public IP {name}: {e}")
-            return False
-
-
-class NSGCleaner(ResourceCleaner):
-    resource_type = "nsg"
-    dependencies = ["nic"]
-
-    def __init__(self, credential: TokenCredential, config: Config):
-        super().__init__(credential, config)
-        self.graph = ResourceGraphQuery(credential)
-
-    def discover(self, subscriptions: List[str]) -> List[Dict[str, Any]]:
-        logging.info("Discovering unused NSGs...")
-        nsgs = self.graph.find_unused_nsgs(subscriptions)
-        logging.info(f"Found {len(nsgs)} unused NSGs")
-        return nsgs
-
-    @retry_with_backoff()
-    def delete(self, resource: Dict[str, Any]) -> bool:
-        sub_id = resource["subscriptionId"]
-        rg = resource["resourceGroup"]
-        name = resource["name"]
-
-        logging.info(f"Deleting NSG {name}")
-        try:
-            client = NetworkManagementClient(self.credential, sub_id)
-            poller = client.network_security_groups.begin_delete(rg, name)
-            poller.result()
-            return True
-        except Exception as e:
-            logging.error(f"Failed to delete NSG {name}: {e}")
-            return False
+from .spec import CleanerSpec, SpecCleaner
+
+
+class NICCleaner(SpecCleaner):
+    spec = CleanerSpec(
+        resource_type="nic",
+        arm_type="microsoft.network/networkinterfaces",
+        predicate="isnull(properties.virtualMachine)",
+        client=NetworkManagementClient,
+        operation="network_interfaces.begin_delete",
+        noun="NIC",
+        label="orphan NICs",
+        dependencies=("vm",),
+        holders="pack_array(properties.virtualMachine)",
+    )
+
+
+class PublicIPCleaner(SpecCleaner):
+    spec = CleanerSpec(
+        resource_type="publicip",
+        arm_type="microsoft.network/publicipaddresses",
+        predicate="isnull(properties.ipConfiguration)",
+        client=NetworkManagementClient,
+        operation="public_ip_addresses.begin_delete",
+        noun="Public IP",
+        label="unused Public IPs",
+        dependencies=("nic", "vm", "lb"),
+        fields={"skuName": "tostring(sku.name)"},
+        holders="pack_array(properties.ipConfiguration)",
+    )
+
+
+class NSGCleaner(SpecCleaner):
+    spec = CleanerSpec(
+        resource_type="nsg",
+        arm_type="microsoft.network/networksecuritygroups",
+        predicate=(
+            "(isnull(properties.networkInterfaces) or array_length(properties.networkInterfaces) == 0)"
+            " and (isnull(properties.subnets) or array_length(properties.subnets) == 0)"
+        ),
+        client=NetworkManagementClient,
+        operation="network_security_groups.begin_delete",
+        noun="NSG",
+        label="unused NSGs",
+        dependencies=("nic",),
+        holders=(
+            "array_concat(iff(isnull(properties.networkInterfaces), dynamic([]), properties.networkInterfaces),"
+            " iff(isnull(properties.subnets), dynamic([]), properties.subnets))"
+        ),
+    )
+
+
+class VNetCleaner(SpecCleaner):
+    # Empty = no subnet has anything connected to it, and no peerings
+    spec = CleanerSpec(
+        resource_type="vnet",
+        arm_type="microsoft.network/virtualnetworks",
+        predicate=(
+            r"""not(tostring(properties.subnets) matches regex @'"(ipConfigurations|privateEndpoints|serviceAssociationLinks|ipConfigurationProfiles)":\[\{')"""
+            " and (isnull(properties.virtualNetworkPeerings) or array_length(properties.virtualNetworkPeerings) == 0)"
+        ),
+        client=NetworkManagementClient,
+        operation="virtual_networks.begin_delete",
+        noun="VNet",
+        label="empty VNets",
+        dependencies=("nic", "lb"),
+    )
+
+
+class LoadBalancerCleaner(SpecCleaner):
+    # Unused = no backend pool member (NIC or IP based) and no NAT rule target
+    spec = CleanerSpec(
+        resource_type="lb",
+        arm_type="microsoft.network/loadbalancers",
+        predicate=(
+            r"""not(tostring(properties.backendAddressPools) matches regex @'"(backendIPConfigurations|loadBalancerBackendAddresses)":\[\{')"""
+            r""" and not(tostring(properties.inboundNatRules) matches regex @'"backendIPConfiguration":\{')"""
+        ),
+        client=NetworkManagementClient,
+        operation="load_balancers.begin_delete",
+        noun="Load Balancer",
+        label="unused Load Balancers",
+        dependencies=("nic", "vm"),
+        fields={"skuName": "tostring(sku.name)"},
+    )
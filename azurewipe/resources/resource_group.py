@@ -1,39 +1,47 @@
 """Empty Resource Group cleaner."""
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from azure.mgmt.resource import ResourceManagementClient
 from azure.core.credentials import TokenCredential
 from azurewipe.core.config import Config
+from azurewipe.core.progress import ProgressTracker
+from azurewipe.scheduler import RunBudget
 from azurewipe.core.graph import ResourceGraphQuery
-from azurewipe.core.retry import retry_with_backoff
-from .base import ResourceCleaner
+from azurewipe.core.inventory import glob_regex
+from azurewipe.core.clients import get_client
+from .base import DeleteResult, DeleteStatus, ResourceCleaner
 
 
 class ResourceGroupCleaner(ResourceCleaner):
     resource_type = "resource_group"
-    dependencies = ["vm", "disk", "nic", "publicip", "nsg"]  # Delete last
+    dependencies = [
+        "vm", "snapshot", "image", "disk", "nic", "lb", "publicip", "nsg", "vnet", "storage", "appserviceplan",
+    ]  # Delete last
 
-    def __init__(self, credential: TokenCredential, config: Config):
-        super().__init__(credential, config)
-        self.graph = ResourceGraphQuery(credential)
+    def __init__(self, credential: TokenCredential, config: Config,
+                 progress: Optional[ProgressTracker] = None, budget: Optional[RunBudget] = None):
+        super().__init__(credential, config, progress, budget)
+        self.graph = ResourceGraphQuery(credential, config.management_groups)
 
     def discover(self, subscriptions: List[str]) -> List[Dict[str, Any]]:
         logging.info("Discovering empty Resource Groups...")
-        rgs = self.graph.find_empty_resource_groups(subscriptions)
+        rgs = self.graph.find_empty_resource_groups(subscriptions, glob_regex(self.config.resource_groups))
         logging.info(f"Found {len(rgs)} empty Resource Groups")
         return rgs
 
-    @retry_with_backoff()
-    def delete(self, resource: Dict[str, Any]) -> bool:
-        sub_id = resource["subscriptionId"]
-        name = resource["name"]
-
-        logging.info(f"Deleting Resource Group {name}")
+    def delete(self, resource: Dict[str, Any]) -> DeleteResult:
+        client = get_client(ResourceManagementClient, self.credential, resource["subscriptionId"])
+        # Deleting a group deletes everything in it, and "empty" came from an
+        # inventory that may be hours old; ask ARM directly right before deleting
         try:
-            client = ResourceManagementClient(self.credential, sub_id)
-            poller = client.resource_groups.begin_delete(name)
-            poller.result()
-            return True
+            occupant = next(iter(client.resources.list_by_resource_group(resource["name"], top=1)), None)
         except Exception as e:
-            logging.error(f"Failed to delete RG {name}: {e}")
-            return False
+            outcome = DeleteResult.from_error(e)
+            if not outcome.ok:
+                logging.error(f"Could not confirm Resource Group {resource['name']} is empty: {e}")
+            return outcome
+        if occupant is not None:
+            logging.warning(f"Resource Group {resource['name']} is no longer empty ({occupant.id}), skipping")
+            return DeleteResult(DeleteStatus.SKIPPED, "no longer empty")
+        return self._run_delete("Resource Group", resource["name"], client.resource_groups.begin_delete,
+                                resource["name"])
@@ -0,0 +1,69 @@
+"""Declarative cleaners: a KQL predicate, a delete operation and dependency edges."""
+import logging
+from dataclasses import dataclass, field
+from operator import attrgetter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from azure.core.credentials import TokenCredential
+from azurewipe.core.config import Config
+from azurewipe.core.graph import ResourceGraphQuery
+from azurewipe.core.progress import ProgressTracker
+from azurewipe.scheduler import RunBudget
+from azurewipe.core.clients import get_client
+from .base import DeleteResult, ResourceCleaner
+
+
+def by_rg_and_name(resource: Dict[str, Any]) -> tuple:
+    return (resource["resourceGroup"], resource["name"])
+
+
+def by_id(api_version: str) -> Callable[[Dict[str, Any]], tuple]:
+    """Arguments for ResourceManagementClient.resources.begin_delete_by_id."""
+    return lambda resource: (resource["id"], api_version)
+
+
+@dataclass(frozen=True)
+class CleanerSpec:
+    resource_type: str  # Config/CLI name, e.g. "nic"
+    arm_type: str  # Resource Graph type, e.g. "microsoft.network/networkinterfaces"
+    predicate: str  # KQL boolean expression selecting deletable resources
+    client: type  # Management client class, built per subscription
+    operation: str  # Dotted delete method on the client
+    noun: str  # Singular, for logs
+    label: str  # Plural, for logs and the TUI
+    dependencies: Tuple[str, ...] = ()  # Types that must be cleaned first
+    fields: Dict[str, str] = field(default_factory=dict)  # Extra projected columns
+    args: Callable[[Dict[str, Any]], tuple] = by_rg_and_name
+    # KQL dynamic array of what keeps a resource in use (IDs or {id} objects),
+    # for types whose predicate is exactly "nothing holds it"
+    holders: str = ""
+    opt_in: bool = False  # Only cleaned when listed explicitly in resource_types
+
+
+class SpecCleaner(ResourceCleaner):
+    """ResourceCleaner driven entirely by a CleanerSpec."""
+
+    spec: CleanerSpec
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.resource_type = cls.spec.resource_type
+        cls.dependencies = list(cls.spec.dependencies)
+        cls.opt_in = cls.spec.opt_in
+
+    def __init__(self, credential: TokenCredential, config: Config,
+                 progress: Optional[ProgressTracker] = None, budget: Optional[RunBudget] = None):
+        super().__init__(credential, config, progress, budget)
+        self.graph = ResourceGraphQuery(credential, config.management_groups)
+
+    def discover(self, subscriptions: List[str]) -> List[Dict[str, Any]]:
+        logging.info(f"Discovering {self.spec.label}...")
+        condition = self.config.lifetime_kql()
+        conditions = {self.resource_type: condition} if condition else None
+        resources = self.graph.discover([self.spec], subscriptions, conditions)[self.resource_type]
+        logging.info(f"Found {len(resources)} {self.spec.label}")
+        return resources
+
+    def delete(self, resource: Dict[str, Any]) -> DeleteResult:
+        client = get_client(self.spec.client, self.credential, resource["subscriptionId"])
+        operation = attrgetter(self.spec.operation)(client)
+        return self._run_delete(self.spec.noun, resource["name"], operation, *self.spec.args(resource))
@@ -0,0 +1,19 @@
+"""Storage account cleaner."""
+from azure.mgmt.storage import StorageManagementClient
+from .spec import CleanerSpec, SpecCleaner
+
+
+class StorageAccountCleaner(SpecCleaner):
+    # Resource Graph can't see account contents, so this relies entirely on
+    # resource group, tag and name filters and never runs under "all".
+    spec = CleanerSpec(
+        resource_type="storage",
+        arm_type="microsoft.storage/storageaccounts",
+        predicate="true",
+        client=StorageManagementClient,
+        operation="storage_accounts.delete",
+        noun="storage account",
+        label="storage accounts",
+        dependencies=("vm",),
+        opt_in=True,
+    )
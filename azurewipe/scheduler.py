@@ -0,0 +1,80 @@
+"""Dependency-aware, cost-first deletion scheduling."""
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+
+def dependency_waves(types: List[str], cleaners: Dict[str, Type]) -> List[List[str]]:
+    """Group resource types into waves whose dependencies are all in earlier waves.
+
+    Only dependencies that are part of this run are considered. `types`
+    order is kept inside a wave so ties stay deterministic.
+    """
+    remaining = [t for t in types if t in cleaners]
+    waves = []
+    while remaining:
+        wave = [t for t in remaining
+                if not any(d in remaining for d in cleaners[t].dependencies)]
+        if not wave:  # Dependency cycle: fall back to declared order
+            wave = remaining[:1]
+        waves.append(wave)
+        remaining = [t for t in remaining if t not in wave]
+    return waves
+
+
+def prioritise(queue: List[Tuple[Any, Dict[str, Any]]]) -> List[Tuple[Any, Dict[str, Any]]]:
+    """Order (cleaner, resource) pairs by the resource's estimated monthly cost, highest first."""
+    return sorted(queue, key=lambda item: item[1].get("monthlyCost", 0.0), reverse=True)
+
+
+class RunBudget:
+    """Wall-clock and delete-count budget for a run; `None` means unlimited.
+
+    Once exhausted no new deletes start. The delete already in flight may
+    run `grace` seconds past the deadline; after that it is left to finish
+    in Azure and recorded as deferred.
+    """
+
+    def __init__(self, seconds: Optional[float] = None, max_deletes: Optional[int] = None,
+                 operation_timeout: Optional[float] = None, grace: float = 60.0):
+        self.deadline = time.monotonic() + seconds if seconds else None
+        self.max_deletes = max_deletes
+        self.operation_timeout = operation_timeout
+        self.grace = grace
+        self.started = 0
+        self._lock = threading.Lock()
+
+    @property
+    def exhausted(self) -> bool:
+        if self.max_deletes is not None and self.started >= self.max_deletes:
+            return True
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def try_spend(self) -> bool:
+        """Count one delete as started unless the budget is exhausted; safe across threads."""
+        with self._lock:
+            if self.exhausted:
+                return False
+            self.started += 1
+            return True
+
+    def __getstate__(self):  # Sent to worker processes by the processes executor
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def remaining(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def wait_timeout(self) -> Optional[float]:
+        """How long to wait on the current operation before giving up on it."""
+        limits = [] if self.operation_timeout is None else [self.operation_timeout]
+        if self.deadline is not None:
+            limits.append(self.remaining() + self.grace)
+        return min(limits) if limits else None
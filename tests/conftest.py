@@ -0,0 +1,8 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """Keep tokens, run state and cached listings out of the real cache directory."""
+    monkeypatch.setenv("AZUREWIPE_CACHE_DIR", str(tmp_path / "cache"))
+    return tmp_path / "cache"
@@ -0,0 +1,103 @@
+import pytest
+
+from azurewipe.core.config import Config, Policy, _parse_config, parse_duration, parse_timestamp
+
+
+@pytest.mark.parametrize("value, seconds", [
+    ("90s", 90), ("30m", 1800), ("12h", 43200), (" 7d ", 604800), ("2w", 1209600), ("1.5h", 5400), (None, None),
+])
+def test_parse_duration(value, seconds):
+    assert parse_duration(value) == seconds
+
+
+@pytest.mark.parametrize("value", ["7", 7, "7y", "d", "-1d", "7 days", ""])
+def test_parse_duration_requires_a_unit(value):
+    with pytest.raises(ValueError):
+        parse_duration(value)
+
+
+@pytest.mark.parametrize("value, epoch", [
+    ("1970-01-02T00:00:00Z", 86400),
+    ("1970-01-02", 86400),  # UTC when there is no offset
+    ("1970-01-02T01:00:00+01:00", 86400),
+    ("1970-01-01T00:00:01.1234567Z", 1.123457),  # Resource Graph's 7-digit fractions
+])
+def test_parse_timestamp(value, epoch):
+    assert parse_timestamp(value) == pytest.approx(epoch)
+
+
+@pytest.mark.parametrize("value", [None, "", "never", "2024-13-01"])
+def test_parse_timestamp_rejects_garbage(value):
+    assert parse_timestamp(value) is None
+
+
+def test_matches_lifetime():
+    now = 10 * 86400.0
+    config = Config(min_age=parse_duration("7d"), min_idle=parse_duration("1d"), expiry_tag="expires")
+    old = {"createdAt": "1970-01-02", "idleSince": "1970-01-08", "tags": {"expires": "1970-01-05"}}
+    assert config.matches_lifetime(old, now)
+    assert not config.matches_lifetime({**old, "createdAt": "1970-01-05"}, now)
+    assert not config.matches_lifetime({**old, "idleSince": None}, now)
+    assert not config.matches_lifetime({**old, "tags": {"expires": "1970-02-01"}}, now)
+    assert not config.matches_lifetime({**old, "tags": {"expires": "soon"}}, now)
+    assert Config().matches_lifetime({}, now)
+
+
+def test_lifetime_kql():
+    assert Config().lifetime_kql() is None
+    config = Config(min_age=parse_duration("7d"), expiry_tag='team "x"')
+    assert config.lifetime_kql() == 'createdAt < ago(604800s) and todatetime(tags["team \\"x\\""]) < now()'
+
+
+def test_resolve_policies_inherit_and_stay_within_the_top_level():
+    config = Config(subscriptions=["sub-a", "sub-b"], resource_groups=["rg-*"], exclude_patterns=["keep-*"],
+                    dry_run=False, policies=[
+                        Policy(name="narrow", subscriptions=["sub-b", "sub-c"], resource_groups=["all"]),
+                        Policy(name="report", exclude_patterns=[], dry_run=True),
+                    ])
+    narrow, report = config.resolve_policies()
+    assert narrow.name == "narrow" and narrow.within is config and narrow.policies == []
+    assert narrow.exclude_patterns == ["keep-*"]
+    assert narrow.should_include_subscription("SUB-B")
+    assert not narrow.should_include_subscription("sub-c")  # Outside the top-level list
+    assert not narrow.should_include_rg("other")
+    assert not narrow.dry_run
+    assert report.exclude_patterns == [] and report.dry_run
+    assert Config().resolve_policies()[0].within is None
+
+
+def test_resolve_policies_dry_run_run_keeps_every_policy_dry():
+    config = Config(dry_run=True, policies=[Policy(name="live")])
+    assert config.resolve_policies()[0].dry_run
+
+
+def test_parse_config_policies():
+    config = _parse_config({
+        "dry_run": False,
+        "min_age": "30d",
+        "policies": [{"name": "idle", "min_idle": "7d", "tag_filters": {"include": {"env": ["dev"]}}}, {}],
+    })
+    idle, unnamed = config.resolve_policies()
+    assert (idle.min_age, idle.min_idle) == (2592000, 604800)
+    assert idle.tag_filters.include == {"env": ["dev"]}
+    assert unnamed.name == "policy-2" and unnamed.min_idle is None
+
+
+def test_parse_config_rejects_duplicate_policy_names():
+    with pytest.raises(ValueError, match="Duplicate policy name"):
+        _parse_config({"policies": [{"name": "a"}, {"name": "a"}]})
+
+
+@pytest.mark.parametrize("data", [
+    {"resource_types": ["resource_group"], "min_age": "7d"},
+    {"policies": [{"name": "rgs", "resource_types": ["resource_group"], "min_idle": "1d"}]},
+    {"resource_types": ["resource_group"], "policies": [{"name": "old", "min_age": "1d"}]},
+])
+def test_parse_config_rejects_age_rules_on_resource_groups(data):
+    with pytest.raises(ValueError, match="resource_group"):
+        _parse_config(data)
+
+
+def test_parse_config_allows_expiry_on_resource_groups():
+    config = _parse_config({"resource_types": ["resource_group"], "expiry_tag": "expires"})
+    assert config.expiry_tag == "expires"
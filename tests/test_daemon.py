@@ -0,0 +1,136 @@
+import http.client
+import json
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from azurewipe.core.config import Config
+from azurewipe.daemon import MAX_BODY, ScopeError, _make_server, validate_overrides
+
+TOKEN = "secret"
+
+
+def scoped_config(**kwargs) -> Config:
+    defaults = dict(
+        subscriptions=["sub-a", "sub-b"],
+        resource_groups=["dev-*", "sandbox"],
+        resource_types=["disk", "nic"],
+        time_budget=600,
+        max_deletes=100,
+    )
+    defaults.update(kwargs)
+    return Config(**defaults)
+
+
+@pytest.mark.parametrize("overrides", [
+    {"dry_run": True},
+    {"subscriptions": ["SUB-A"]},
+    {"resource_groups": ["dev-team1", "sandbox"]},
+    {"resource_groups": ["dev-*"]},
+    {"resource_types": ["disk"]},
+    {"time_budget": 60, "max_deletes": 10},
+])
+def test_narrowing_overrides_pass(overrides):
+    assert validate_overrides(scoped_config(), overrides) == overrides
+
+
+@pytest.mark.parametrize("overrides", [
+    {"dry_run": False},
+    {"subscriptions": ["sub-c"]},
+    {"subscriptions": ["all"]},
+    {"resource_groups": ["prod"]},
+    {"resource_groups": ["dev-*-x"]},
+    {"resource_groups": ["all"]},
+    {"resource_types": ["vm"]},
+    {"time_budget": 601},
+    {"max_deletes": 101},
+])
+def test_widening_overrides_are_scope_errors(overrides):
+    with pytest.raises(ScopeError):
+        validate_overrides(scoped_config(), overrides)
+
+
+def test_opt_in_types_stay_out_of_an_all_config():
+    config = scoped_config(resource_types=["all"])
+    validate_overrides(config, {"resource_types": ["disk", "vm"]})
+    with pytest.raises(ScopeError):
+        validate_overrides(config, {"resource_types": ["storage"]})
+
+
+@pytest.mark.parametrize("overrides", [
+    {"policies": []},
+    {"dry_run": "false"},
+    {"subscriptions": "sub-a"},
+    {"subscriptions": []},
+    {"resource_groups": [""]},
+    {"time_budget": 0},
+    {"max_deletes": True},
+    {"max_deletes": 1.5},
+])
+def test_malformed_overrides_are_value_errors(overrides):
+    with pytest.raises(ValueError) as info:
+        validate_overrides(scoped_config(), overrides)
+    assert not isinstance(info.value, ScopeError)
+
+
+@pytest.fixture
+def server():
+    submitted = []
+
+    def submit(trigger, **overrides):
+        submitted.append(overrides)
+        return SimpleNamespace(id="run1", to_dict=lambda: {"id": "run1"})
+
+    app = SimpleNamespace(token=TOKEN, config=scoped_config(dry_run=True), submit=submit)
+    httpd = _make_server(app, "127.0.0.1:0", None)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd, submitted
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def post(httpd, body: bytes, headers=None):
+    conn = http.client.HTTPConnection(*httpd.server_address, timeout=5)
+    base = {"Authorization": f"Bearer {TOKEN}", "Content-Type": "application/json"}
+    conn.request("POST", "/runs", body=body, headers={**base, **(headers or {})})
+    response = conn.getresponse()
+    return response.status, json.loads(response.read() or b"null")
+
+
+def test_post_accepts_narrowing_body(server):
+    httpd, submitted = server
+    status, _ = post(httpd, json.dumps({"subscriptions": ["sub-a"]}).encode())
+    assert status == 202
+    assert submitted == [{"subscriptions": ["sub-a"]}]
+
+
+def test_post_scope_error_is_403(server):
+    httpd, submitted = server
+    status, payload = post(httpd, json.dumps({"dry_run": False}).encode())
+    assert status == 403
+    assert "dry-run" in payload["error"]
+    assert submitted == []
+
+
+def test_post_malformed_body_is_400(server):
+    httpd, submitted = server
+    assert post(httpd, json.dumps({"max_deletes": "5"}).encode())[0] == 400
+    assert post(httpd, b"[1, 2]")[0] == 400
+    assert post(httpd, b"{not json")[0] == 400
+    assert submitted == []
+
+
+@pytest.mark.parametrize("length", ["-1", str(MAX_BODY + 1)])
+def test_post_rejects_bad_content_length(server, length):
+    httpd, submitted = server
+    status, _ = post(httpd, b"{}", headers={"Content-Length": length})
+    assert status == 400
+    assert submitted == []
+
+
+def test_post_needs_token_and_json(server):
+    httpd, _ = server
+    assert post(httpd, b"{}", headers={"Authorization": "Bearer wrong"})[0] == 401
+    assert post(httpd, b"{}", headers={"Content-Type": "text/plain"})[0] == 415
@@ -0,0 +1,41 @@
+from types import SimpleNamespace
+
+import pytest
+from azure.core.exceptions import HttpResponseError, ResourceNotFoundError, ServiceRequestError
+
+from azurewipe.resources.base import DeleteResult, DeleteStatus
+
+
+def http_error(status_code: int) -> HttpResponseError:
+    response = SimpleNamespace(status_code=status_code, reason="", headers={}, text=lambda: "")
+    error = HttpResponseError(message=f"status {status_code}", response=response)
+    assert error.status_code == status_code
+    return error
+
+
+def test_not_found_is_already_gone():
+    result = DeleteResult.from_error(ResourceNotFoundError("gone"))
+    assert result.status is DeleteStatus.ALREADY_GONE
+    assert result.ok
+
+
+def test_404_while_polling_is_already_gone():
+    # azure-core's LRO polling raises a plain HttpResponseError on a 404 status poll
+    result = DeleteResult.from_error(http_error(404))
+    assert result.status is DeleteStatus.ALREADY_GONE
+    assert result.ok
+
+
+@pytest.mark.parametrize("code", [429, 503])
+def test_throttling_is_throttled(code):
+    result = DeleteResult.from_error(http_error(code))
+    assert result.status is DeleteStatus.THROTTLED
+    assert result.status_code == code
+    assert not result.ok
+
+
+@pytest.mark.parametrize("error", [http_error(409), http_error(500), ServiceRequestError("reset")])
+def test_other_errors_fail(error):
+    result = DeleteResult.from_error(error)
+    assert result.status is DeleteStatus.FAILED
+    assert not result.ok
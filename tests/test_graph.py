@@ -0,0 +1,55 @@
+from types import SimpleNamespace
+
+import pytest
+
+from azurewipe.core import graph
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(graph, "time", SimpleNamespace(time=lambda: now[0]))
+    monkeypatch.setattr(graph, "_DIRECTORY_CACHE", {})
+    return now
+
+
+def counting_fetch():
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return [{"n": len(calls)}]
+    return fetch, calls
+
+
+def test_listing_is_served_from_memory_within_ttl(clock):
+    fetch, calls = counting_fetch()
+    assert graph._cached_listing("k", fetch) == [{"n": 1}]
+    clock[0] += graph.DIRECTORY_TTL - 1
+    assert graph._cached_listing("k", fetch) == [{"n": 1}]
+    assert len(calls) == 1
+
+
+def test_in_memory_listing_expires(clock):
+    fetch, calls = counting_fetch()
+    graph._cached_listing("k", fetch)
+    clock[0] += graph.DIRECTORY_TTL + 1
+    assert graph._cached_listing("k", fetch) == [{"n": 2}]
+    assert len(calls) == 2
+
+
+def test_listing_is_shared_through_disk(clock, monkeypatch):
+    fetch, calls = counting_fetch()
+    graph._cached_listing("k", fetch)
+    monkeypatch.setattr(graph, "_DIRECTORY_CACHE", {})  # A new process
+    clock[0] += 10
+    assert graph._cached_listing("k", fetch) == [{"n": 1}]
+    # The disk entry keeps its original age
+    clock[0] += graph.DIRECTORY_TTL - 5
+    assert graph._cached_listing("k", fetch) == [{"n": 2}]
+
+
+def test_refresh_bypasses_the_cache(clock):
+    fetch, calls = counting_fetch()
+    graph._cached_listing("k", fetch)
+    assert graph._cached_listing("k", fetch, refresh=True) == [{"n": 2}]
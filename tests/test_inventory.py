@@ -0,0 +1,88 @@
+import re
+
+import pytest
+
+from azurewipe.core.inventory import Inventory, Snapshot, glob_regex
+from azurewipe.resources import CLEANERS, SpecCleaner
+
+SPECS = [c.spec for c in CLEANERS.values() if issubclass(c, SpecCleaner)]
+SUB = "/subscriptions/00000000-0000-0000-0000-000000000001"
+VM = f"{SUB}/resourceGroups/rg/providers/Microsoft.Compute/virtualMachines/vm1"
+NIC = f"{SUB}/resourceGroups/rg/providers/Microsoft.Network/networkInterfaces/nic1"
+DISK = f"{SUB}/resourceGroups/rg/providers/Microsoft.Compute/disks/disk1"
+IP = f"{SUB}/resourceGroups/rg/providers/Microsoft.Network/publicIPAddresses/ip1"
+
+
+@pytest.mark.parametrize("patterns, matches, misses", [
+    (["rg-dev-*"], ["rg-dev-1", "RG-DEV-x"], ["rg-prod", "xrg-dev-1"]),
+    (["a.b", "c?"], ["a.b", "cd"], ["axb", "c", "cde"]),
+])
+def test_glob_regex_is_a_case_insensitive_superset(patterns, matches, misses):
+    regex = re.compile(glob_regex(patterns))
+    assert all(regex.match(m) for m in matches)
+    assert not any(regex.match(m) for m in misses)
+
+
+@pytest.mark.parametrize("patterns", [None, [], ["all"], ["rg-[ab]"]])
+def test_glob_regex_without_pushdown(patterns):
+    assert glob_regex(patterns) is None
+
+
+def test_inventory_tracks_emptied_groups():
+    groups = [{"subscriptionId": "SUB", "name": "RG-A"}, {"subscriptionId": "sub", "name": "rg-b"},
+              {"subscriptionId": "sub", "name": "rg-empty"}]
+    inventory = Inventory(groups, {("sub", "rg-a"): 2, ("sub", "rg-b"): 1})
+    assert [g["name"] for g in inventory.empty_groups()] == ["rg-empty"]
+    inventory.remove({"subscriptionId": "sub", "resourceGroup": "rg-a"})
+    inventory.remove({"subscriptionId": "Sub", "resourceGroup": "RG-B"})
+    inventory.remove({"subscriptionId": "sub", "resourceGroup": "rg-b"})  # Never goes negative
+    assert [g["name"] for g in inventory.empty_groups()] == ["rg-b", "rg-empty"]
+    assert inventory.counts[("sub", "rg-b")] == 0
+    inventory.remove({"subscriptionId": "sub", "resourceGroup": "rg-a"})
+    assert [g["name"] for g in inventory.empty_groups()] == ["RG-A", "rg-b", "rg-empty"]
+
+
+def test_inventory_hands_out_copies():
+    inventory = Inventory([{"subscriptionId": "sub", "name": "rg"}], {})
+    inventory.empty_groups()[0]["name"] = "changed"
+    assert inventory.empty_groups()[0]["name"] == "rg"
+
+
+def snapshot():
+    return Snapshot(SPECS, [
+        {"id": VM, "type": "microsoft.compute/virtualmachines", "_kind": "vm"},
+        {"id": NIC, "type": "Microsoft.Network/networkInterfaces", "_kind": "", "_held": [{"id": VM}]},
+        {"id": DISK, "type": "microsoft.compute/disks", "_kind": "", "_held": [VM]},
+        {"id": IP, "type": "microsoft.network/publicipaddresses", "_kind": "",
+         "_held": [{"id": f"{NIC}/ipConfigurations/ipconfig1"}]},
+        {"id": f"{SUB}/resourceGroups/rg/providers/Microsoft.Compute/disks/reserved",
+         "type": "microsoft.compute/disks", "_kind": ""},
+    ])
+
+
+def test_snapshot_indexes_candidates_and_holders():
+    snap = snapshot()
+    assert set(snap.kinds.values()) == {"vm", "nic", "disk", "publicip"}
+    assert snap.holders[IP.lower()] == {NIC.lower()}  # IP configuration folded into its NIC
+    assert snap.holding[VM.lower()] == {NIC.lower(), DISK.lower()}
+    assert [r["id"] for r in snap.take("vm")] == [VM]
+    assert snap.take("vm") == []  # Each resource is handed out once
+
+
+def test_snapshot_orphans_become_candidates():
+    snap = snapshot()
+    vm = snap.take("vm")[0]
+    assert snap.remove(vm) == 2
+    orphans = {r["id"]: r for kind in ("nic", "disk") for r in snap.take(kind)}
+    assert set(orphans) == {NIC, DISK}
+    assert all(r["idleSince"] for r in orphans.values())
+    assert snap.take("publicip") == []  # Still held by the NIC
+    assert snap.remove(orphans[NIC]) == 1
+    assert [r["id"] for r in snap.take("publicip")] == [IP]
+    assert snap.orphaned == 3
+
+
+def test_snapshot_remove_of_unknown_resource_is_harmless():
+    snap = snapshot()
+    assert snap.remove({"id": f"{SUB}/resourceGroups/rg/providers/x/y/z"}) == 0
+    assert snap.orphaned == 0
@@ -0,0 +1,148 @@
+import copy
+import fnmatch
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from azurewipe.cleaner import AzureResourceCleaner
+from azurewipe.core.config import Config, Policy, TagFilters, parse_duration
+from azurewipe.planner import InventoryTable, Planner
+from azurewipe.resources import CLEANERS
+
+NOW = datetime.now(timezone.utc)
+# Ages stay well clear of every threshold below, so the two paths' clocks can't disagree
+AGES_DAYS = [1, 3, 20, 100, 400]
+
+
+class StubCredential:
+    def get_token(self, *scopes, **kwargs):
+        raise AssertionError("the planner parity test must not call Azure")
+
+
+def _timestamp(rng: random.Random):
+    choice = rng.random()
+    if choice < 0.1:
+        return None
+    if choice < 0.15:
+        return "not-a-date"
+    return (NOW - timedelta(days=rng.choice(AGES_DAYS))).isoformat()
+
+
+def generate_rows(count: int = 2000, seed: int = 31):
+    rng = random.Random(seed)
+    kinds = list(CLEANERS)
+    prefixes = ["web", "Web", "db", "tmp", "keep", "cache", "a[b]"]
+    subs = ["SUB-A", "sub-a", "sub-b", "sub-c"]
+    rgs = ["rg-dev-1", "rg-dev-2", "RG-Dev-3", "rg-prod", "rg-a", "rg-b", "shared"]
+    rows = []
+    for i in range(count):
+        tags = {}
+        if rng.random() < 0.6:
+            tags["env"] = rng.choice(["dev", "prod", "test", "Dev"])
+        if rng.random() < 0.3:
+            tags["owner"] = rng.choice(["alice", "bob", "ci"])
+        if rng.random() < 0.3:
+            days = rng.choice([-30, -2, 2, 30])
+            tags["expires"] = rng.choice([(NOW + timedelta(days=days)).date().isoformat(), "never"])
+        kind = rng.choice(kinds)
+        name = f"{rng.choice(prefixes)}-{rng.randrange(100)}"
+        rows.append({
+            "id": f"/subscriptions/{i}/resourceGroups/rg/providers/x/{kind}/{name}-{i}",
+            "name": name,
+            "_kind": kind,
+            "subscriptionId": rng.choice(subs),
+            "resourceGroup": rng.choice(rgs),
+            "tags": tags,
+            "createdAt": _timestamp(rng),
+            "idleSince": _timestamp(rng),
+        })
+    return rows
+
+
+CONFIGS = {
+    "default": Config(dry_run=False),
+    "filters": Config(
+        dry_run=False,
+        subscriptions=["sub-a", "sub-c"],
+        resource_groups=["rg-dev-*", "rg-[ab]"],
+        resource_types=["disk", "nic", "snapshot", "image", "resource_group"],
+        exclude_patterns=["tmp-*", "*-1?", "Web*", "a[[]b]*"],
+        tag_filters=TagFilters(include={"env": ["dev", "test"]}, exclude={"owner": ["alice"]}),
+        min_age=parse_duration("7d"),
+    ),
+    "lifetime": Config(dry_run=False, min_idle=parse_duration("30d"), expiry_tag="expires"),
+    "policies": Config(
+        dry_run=False,
+        resource_types=["disk", "nic", "publicip", "vm", "snapshot", "resource_group"],
+        resource_groups=["rg-*", "shared"],
+        exclude_patterns=["keep-*"],
+        policies=[
+            Policy(name="report-prod", tag_filters=TagFilters(include={"env": ["prod"]}), dry_run=True),
+            Policy(name="idle-disks", resource_types=["disk", "nic"], min_idle=parse_duration("7d")),
+            Policy(name="expired", expiry_tag="expires", subscriptions=["SUB-B"]),
+            Policy(name="old-dev", resource_groups=["rg-dev-*"], min_age=parse_duration("30d"),
+                   exclude_patterns=["db-*"]),
+            Policy(name="everything-else", resource_types=["all", "storage"], resource_groups=["shared"]),
+        ],
+    ),
+}
+
+
+def cleaner_deletes(config: Config, rows):
+    """IDs a live run of `config` would delete, through the cleaner's own assignment."""
+    wipe = AzureResourceCleaner(config, credential=StubCredential())
+    for policy in wipe.policies:
+        for res_type in wipe._types_for(policy):
+            wipe.cleaners.setdefault(res_type, {})[policy.name] = CLEANERS[res_type](
+                wipe.credential, policy, wipe.progress)
+    deleted = set()
+    for res_type in wipe.cleaners:
+        candidates = [r for r in copy.deepcopy(rows) if r.pop("_kind") == res_type]
+        for cleaner, res in wipe._assign(res_type, candidates):
+            if not cleaner.config.dry_run:
+                deleted.add(res["id"])
+    return deleted
+
+
+@pytest.fixture(scope="module")
+def rows():
+    return generate_rows()
+
+
+@pytest.fixture(scope="module")
+def planner(rows):
+    return Planner(InventoryTable(copy.deepcopy(rows)))
+
+
+@pytest.mark.parametrize("name", list(CONFIGS))
+def test_planner_mask_matches_cleaner_selection(rows, planner, name):
+    config = CONFIGS[name]
+    mask = planner.mask(config)
+    planned = {planner.inv.ids[i] for i in mask.nonzero()[0]}
+    expected = cleaner_deletes(config, rows)
+    assert expected, "config selects nothing, so the comparison proves little"
+    assert planned == expected
+
+
+def test_report_only_policy_claims_its_rows(rows, planner):
+    everything = Config(dry_run=False, policies=[Policy(name="all")])
+    reported = Config(dry_run=False, policies=[Policy(name="report", dry_run=True), Policy(name="all")])
+    assert planner.mask(everything).any()
+    assert not planner.mask(reported).any()
+
+
+def test_evaluate_counts_and_diff(planner):
+    results = planner.evaluate({"default": CONFIGS["default"], "filters": CONFIGS["filters"]})
+    assert [r.name for r in results] == ["default", "filters"]
+    for result in results:
+        assert result.total == int(result.mask.sum())
+    only_default, only_filters = planner.diff(results[0], results[1])
+    assert set(only_default) == {planner.inv.ids[i] for i in (results[0].mask & ~results[1].mask).nonzero()[0]}
+    assert len(only_filters) == int((results[1].mask & ~results[0].mask).sum())
+
+
+@pytest.mark.parametrize("pattern", ["web-*", "*-7", "?eb-1*", "a[[]b]-*", "[!w]*-5", "*", "nomatch"])
+def test_name_mask_matches_fnmatch(rows, planner, pattern):
+    expected = {r["id"] for r in rows if fnmatch.fnmatchcase(r["name"], pattern)}
+    assert {planner.inv.ids[i] for i in planner.inv.name_mask(pattern).nonzero()[0]} == expected
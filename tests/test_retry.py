@@ -0,0 +1,107 @@
+import time
+from types import SimpleNamespace
+
+from azurewipe.core.retry import (
+    DEADLINE_OPTION, BudgetedRetryPolicy, RetryBudget, add_throttle_listener, remove_throttle_listener,
+)
+
+
+def throttled_response(status_code: int = 429, headers=None):
+    request = SimpleNamespace(method="GET", body=None, files=None)
+    return SimpleNamespace(http_response=SimpleNamespace(status_code=status_code, headers=headers or {}),
+                           http_request=request)
+
+
+def test_throttle_listeners_only_hear_their_own_credential():
+    tenant_a, tenant_b = object(), object()
+    heard_a, heard_b = [], []
+    add_throttle_listener(tenant_a, heard_a.append)
+    add_throttle_listener(tenant_b, heard_b.append)
+    try:
+        policy = BudgetedRetryPolicy(RetryBudget(), credential=tenant_a)
+        assert policy.increment(policy.configure_retries({}), response=throttled_response(503))
+    finally:
+        remove_throttle_listener(tenant_a, heard_a.append)
+        remove_throttle_listener(tenant_b, heard_b.append)
+    assert heard_a == [503]
+    assert heard_b == []
+
+
+def test_no_throttle_notice_without_retry_budget():
+    credential = object()
+    heard = []
+    add_throttle_listener(credential, heard.append)
+    try:
+        policy = BudgetedRetryPolicy(RetryBudget(max_tokens=1, min_per_second=0), credential=credential)
+        settings = policy.configure_retries({})
+        assert policy.increment(settings, response=throttled_response())
+        assert not policy.increment(settings, response=throttled_response())
+    finally:
+        remove_throttle_listener(credential, heard.append)
+    assert heard == [429]
+
+
+def test_connection_error_retry_is_not_a_throttle():
+    from azure.core.exceptions import ServiceRequestError
+    credential = object()
+    heard = []
+    add_throttle_listener(credential, heard.append)
+    try:
+        policy = BudgetedRetryPolicy(RetryBudget(), credential=credential)
+        request = SimpleNamespace(http_request=SimpleNamespace(method="GET", body=None, files=None))
+        assert policy.increment(policy.configure_retries({}), response=request, error=ServiceRequestError("reset"))
+    finally:
+        remove_throttle_listener(credential, heard.append)
+    assert heard == []
+
+
+def test_deadline_option_bounds_retries():
+    policy = BudgetedRetryPolicy(RetryBudget())
+    options = {DEADLINE_OPTION: time.monotonic() + 5}
+    settings = policy.configure_retries(options)
+    assert DEADLINE_OPTION not in options  # Never reaches the transport
+    assert settings["timeout"] <= 5
+    assert policy.increment(settings, response=throttled_response(headers={"Retry-After": "1"}))
+    assert not policy.increment(settings, response=throttled_response(headers={"Retry-After": "60"}))
+
+
+def test_without_deadline_the_default_timeout_applies():
+    policy = BudgetedRetryPolicy(RetryBudget())
+    settings = policy.configure_retries({})
+    assert settings["timeout"] == policy.timeout
+    assert policy.increment(settings, response=throttled_response(headers={"Retry-After": "60"}))
+
+
+def test_retry_budget_caps_retries_at_a_fraction_of_successes(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr("azurewipe.core.retry.time.monotonic", lambda: clock[0])
+    budget = RetryBudget(ratio=0.5, min_per_second=0.0, max_tokens=2)
+    assert budget.withdraw() and budget.withdraw()
+    assert not budget.withdraw()
+    budget.deposit()
+    assert not budget.withdraw()  # Half a token
+    budget.deposit()
+    assert budget.withdraw()
+    for _ in range(10):
+        budget.deposit()
+    assert [budget.withdraw() for _ in range(3)] == [True, True, False]  # Capped at max_tokens
+
+
+def test_retry_budget_refills_over_time(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr("azurewipe.core.retry.time.monotonic", lambda: clock[0])
+    budget = RetryBudget(min_per_second=2.0, max_tokens=1)
+    assert budget.withdraw()
+    assert not budget.withdraw()
+    clock[0] += 0.5
+    assert budget.withdraw()
+    clock[0] += 3600
+    assert [budget.withdraw() for _ in range(2)] == [True, False]
+
+
+def test_successful_requests_refill_the_budget():
+    budget = RetryBudget(ratio=1.0, min_per_second=0.0, max_tokens=1)
+    assert budget.withdraw()
+    policy = BudgetedRetryPolicy(budget)
+    policy.update_context(SimpleNamespace(options={}), policy.configure_retries({}))
+    assert budget.withdraw()
@@ -0,0 +1,86 @@
+import pickle
+from types import SimpleNamespace
+
+import pytest
+
+from azurewipe.resources import CLEANERS
+from azurewipe.scheduler import RunBudget, dependency_waves, prioritise
+
+
+def cleaner(*dependencies):
+    return SimpleNamespace(dependencies=list(dependencies))
+
+
+def test_dependency_waves_put_dependencies_first():
+    cleaners = {"vm": cleaner(), "nic": cleaner("vm"), "publicip": cleaner("nic", "lb"),
+                "lb": cleaner(), "vnet": cleaner("nic")}
+    assert dependency_waves(["vm", "nic", "publicip", "lb", "vnet"], cleaners) == [
+        ["vm", "lb"], ["nic"], ["publicip", "vnet"],
+    ]
+
+
+def test_dependency_waves_ignore_types_outside_the_run():
+    cleaners = {"vm": cleaner(), "nic": cleaner("vm"), "vnet": cleaner("nic")}
+    assert dependency_waves(["vnet", "nic", "unknown"], cleaners) == [["nic"], ["vnet"]]
+    assert dependency_waves(["vnet"], cleaners) == [["vnet"]]
+
+
+def test_dependency_waves_break_cycles_in_declared_order():
+    cleaners = {"a": cleaner("b"), "b": cleaner("a"), "c": cleaner()}
+    assert dependency_waves(["a", "b", "c"], cleaners) == [["c"], ["a"], ["b"]]
+
+
+def test_dependency_waves_cover_every_registered_cleaner():
+    waves = dependency_waves(list(CLEANERS), CLEANERS)
+    seen = set()
+    for wave in waves:
+        for res_type in wave:
+            assert all(d in seen or d not in CLEANERS for d in CLEANERS[res_type].dependencies)
+        seen.update(wave)
+    assert seen == set(CLEANERS)
+
+
+def test_prioritise_orders_by_cost_and_keeps_ties_stable():
+    queue = [("a", {"monthlyCost": 1.0}), ("b", {}), ("c", {"monthlyCost": 9.5}), ("d", {"monthlyCost": 1.0})]
+    assert [c for c, _ in prioritise(queue)] == ["c", "a", "d", "b"]
+
+
+def test_run_budget_unlimited():
+    budget = RunBudget()
+    assert all(budget.try_spend() for _ in range(100))
+    assert budget.remaining() is None
+    assert budget.wait_timeout() is None
+
+
+def test_run_budget_max_deletes():
+    budget = RunBudget(max_deletes=2)
+    assert [budget.try_spend() for _ in range(4)] == [True, True, False, False]
+    assert budget.started == 2
+    assert budget.exhausted
+
+
+def test_run_budget_deadline(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("azurewipe.scheduler.time.monotonic", lambda: clock[0])
+    budget = RunBudget(seconds=60, operation_timeout=300, grace=30)
+    assert budget.try_spend()
+    assert budget.remaining() == 60
+    assert budget.wait_timeout() == 90  # Deadline plus grace beats the operation timeout
+    clock[0] += 60
+    assert budget.remaining() == 0
+    assert budget.wait_timeout() == 30
+    assert not budget.try_spend()
+
+
+@pytest.mark.parametrize("operation_timeout, expected", [(300, 300), (None, None)])
+def test_run_budget_wait_timeout_without_deadline(operation_timeout, expected):
+    assert RunBudget(operation_timeout=operation_timeout).wait_timeout() == expected
+
+
+def test_run_budget_pickles_for_worker_processes():
+    budget = RunBudget(seconds=60, max_deletes=5)
+    budget.try_spend()
+    copy = pickle.loads(pickle.dumps(budget))
+    assert copy.started == 1
+    assert copy.deadline == budget.deadline
+    assert copy.try_spend()